@@ -1,10 +1,15 @@
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-import mss
-import pyautogui
-pyautogui.FAILSAFE = False  # ⚠️ Desativa o fail-safe
+from debug_writer import DebugWriter
+from frame_change import ChangeDetector
+from matcher import PyramidMatcher
+from frame_source import open_source
+from input_driver import get_driver
+from telemetry import get_telemetry, start_exporter
+from vision_watcher import VisionWatcher
 
 
 # Controle de execução
@@ -26,8 +31,19 @@ os.makedirs(DEBUG_DIR, exist_ok=True)
 os.makedirs(DEBUG_REGIONS_DIR, exist_ok=True)
 
 DEBUG_MODE = True  # Toggle region overlay debug
+DEBUG_SAMPLE_EVERY = 5  # grava imagens de debug só a cada N ticks
+DEBUG_QUEUE_SIZE = 16  # fila do gravador; cheia = frame descartado
+DEBUG_QUOTA_MB = 200  # cota por pasta de debug (apaga os mais antigos)
+debug_writer = DebugWriter(max_queue=DEBUG_QUEUE_SIZE, quota_mb=DEBUG_QUOTA_MB)
 MATCH_THRESHOLD = 0.8
-ANALYSIS_INTERVAL = 2  # seconds
+ANALYSIS_INTERVAL = 0.5  # seconds
+MATCH_WORKERS = min(4, os.cpu_count() or 1)  # threads de matching (o OpenCV libera o GIL)
+SINGLE_CAPTURE_TICK = True  # 1 captura + 1 conversão p/ cinza por tick; regiões viram fatias do frame
+TELEMETRY_FILE = "telemetry.prom"  # latências por etapa no formato texto do Prometheus
+TELEMETRY_INTERVAL = 15.0  # s entre gravações
+telemetry = get_telemetry("auto_bot")
+USE_WATCHER = True  # uma thread captura e casa todas as regiões; o loop e a sequência só consomem
+WATCHER_FPS = 10.0  # frames/s do watcher (frescor das detecções ~ 1/FPS)
 
 # Regions and templates
 REGION_PERCENTAGES = {
@@ -103,11 +119,23 @@ def load_templates(folder):
 
 templates = load_templates(ASSET_DIR)
 
-# ==== Get screen size ====
-with mss.mss() as sct:
-    monitor = sct.monitors[1]
+# ==== Frame source / screen size ====
+watcher = None  # VisionWatcher compartilhado (ver get_watcher)
+# ROXBOT_FRAME_SOURCE: vazio = tela; pasta de imagens ou vídeo ("caminho@fps") = replay sem monitor
+capture = None
+SCREEN_WIDTH = SCREEN_HEIGHT = 0
+
+def set_frame_source(source):
+    """Troca a fonte de frames (tela, replay ou sintética) e relê o tamanho da tela."""
+    global capture, SCREEN_WIDTH, SCREEN_HEIGHT
+    capture = source
+    if watcher is not None:
+        watcher.capture = source
+    monitor = capture.monitor()
     SCREEN_WIDTH, SCREEN_HEIGHT = monitor["width"], monitor["height"]
-print(f"[🖥️] Screen size: {SCREEN_WIDTH}x{SCREEN_HEIGHT}")
+    print(f"[🖥️] Screen size: {SCREEN_WIDTH}x{SCREEN_HEIGHT}")
+
+set_frame_source(open_source(os.environ.get("ROXBOT_FRAME_SOURCE")))
 
 # ==== Convert percentages to pixel coords ====
 def get_pixel_regions():
@@ -122,19 +150,28 @@ def get_pixel_regions():
 
 # ==== Capture a region ====
 def capture_region(bbox):
-    with mss.mss() as sct:
-        monitor = {"left": bbox[0], "top": bbox[1],
-                   "width": bbox[2] - bbox[0],
-                   "height": bbox[3] - bbox[1]}
-        img = np.array(sct.grab(monitor))
-        return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+    return capture.grab_bbox(bbox)
+
+def debug_sampled(frame_idx):
+    return DEBUG_MODE and frame_idx % max(DEBUG_SAMPLE_EVERY, 1) == 0
+
+# ==== Capture the whole screen once per tick ====
+def capture_tick():
+    """Frame BGR da tela inteira e sua versão em cinza (convertida uma única vez)."""
+    with telemetry.stage("capture"):
+        frame = capture_region((0, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
+    with telemetry.stage("cvt"):
+        return frame, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
 # ==== Draw region overlay (debug) ====
-# ==== Draw region overlay (debug) ====
-def draw_region_overlay(regions, frame_idx):
-    img = capture_region((0, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
-    
+def draw_region_overlay(regions, frame_idx, frame=None, origin=(0, 0)):
+    # reaproveita o frame do tick (cópia, para não rabiscar o frame usado no matching);
+    # `origin` = canto do frame na tela, quando ele não é a tela inteira (frame do watcher)
+    img = frame.copy() if frame is not None else capture_region((0, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
+    ox, oy = origin
+
     for name, (x1, y1, x2, y2) in regions.items():
+        x1, y1, x2, y2 = x1 - ox, y1 - oy, x2 - ox, y2 - oy
         # Gera uma cor única para cada região com base no nome
         color = tuple(int(x) for x in np.random.default_rng(seed=hash(name) % (2**32)).integers(0, 256, size=3))
         
@@ -144,59 +181,204 @@ def draw_region_overlay(regions, frame_idx):
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
     
     path = os.path.join(DEBUG_REGIONS_DIR, f"{frame_idx:03}_regions.jpg")
-    cv2.imwrite(path, img)
-    print(f"[🖼️] Region overlay saved: {path}")
+    if debug_writer.submit(path, img):
+        print(f"[🖼️] Region overlay queued: {path}")
+
+# ==== Input ====
+# cliques sem pausa: user32 no Windows; nos demais, pyautogui sem PAUSE e com FAILSAFE desativado.
+# Resolvido no primeiro clique, para o módulo importar sem monitor (testes podem trocar por RecordingDriver).
+input_driver = None
+
+def click_at(cx, cy):
+    """Move e clica numa chamada só; devolve a latência do clique (ms)."""
+    global input_driver
+    if input_driver is None:
+        input_driver = get_driver()
+    return input_driver.click(cx, cy)
 
 # ==== Match and click ====
-def match_and_click(region_name, bbox, frame_idx):
-    img = capture_region(bbox)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    found = False
+# Regiões que não mudaram desde a última análise reaproveitam os scores anteriores
+detector = ChangeDetector()
+matcher = PyramidMatcher()
+
+def score_template(region_name, tmpl_name, gray):
+    tmpl = templates.get(tmpl_name)
+    if tmpl is None:
+        return None
+    with telemetry.stage("match"):
+        max_val, max_loc = matcher.match(gray, tmpl)
+    if max_loc is None:
+        return None
+    print(f"[🔍] {tmpl_name} in {region_name}: {max_val:.2f}")
+    return (tmpl_name, max_val, max_loc, tmpl.shape)
 
+def score_region(region_name, gray):
+    scores = []
     for tmpl_name in REGION_TEMPLATES.get(region_name, []):
-        if tmpl_name not in templates:
+        score = score_template(region_name, tmpl_name, gray)
+        if score is not None:
+            scores.append(score)
+    return scores
+
+def region_images(bbox, frame=None, frame_gray=None):
+    if frame is not None and frame_gray is not None:
+        # fatias (views) do frame do tick: nenhuma cópia, nenhuma captura extra
+        x1, y1, x2, y2 = bbox
+        return frame[y1:y2, x1:x2], frame_gray[y1:y2, x1:x2]
+    with telemetry.stage("capture"):
+        img = capture_region(bbox)
+    with telemetry.stage("cvt"):
+        return img, cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+# ==== Parallel matching ====
+_pool = None
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=MATCH_WORKERS, thread_name_prefix="match")
+    return _pool
+
+def score_regions_parallel(regions, frame=None, frame_gray=None):
+    """
+    Espalha os jobs (região × template) pelo pool e devolve {região: (img, scores)}
+    na MESMA ordem de `regions` — os cliques continuam determinísticos.
+    """
+    pool = get_pool()
+    pending = {}
+    for name, bbox in regions.items():
+        img, gray = region_images(bbox, frame, frame_gray)
+        thumb = detector.thumbnail(gray)
+        hit, scores = detector.lookup(name, thumb)
+        if hit:
+            pending[name] = (img, thumb, scores, None)
             continue
-        tmpl = templates[tmpl_name]
-        res = cv2.matchTemplate(gray, tmpl, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        futures = [pool.submit(score_template, name, tmpl_name, gray)
+                   for tmpl_name in REGION_TEMPLATES.get(name, [])]
+        pending[name] = (img, thumb, None, futures)
+
+    results = {}
+    for name, (img, thumb, scores, futures) in pending.items():
+        if futures is not None:
+            scores = [s for s in (f.result() for f in futures) if s is not None]
+            detector.store(name, thumb, scores)
+        results[name] = (img, scores)
+    return results
+
+# ==== Vision watcher ====
+def get_watcher():
+    """Watcher único do processo (loop automático + sequências), criado sob demanda."""
+    global watcher
+    if watcher is None:
+        watcher = VisionWatcher(capture, fps=WATCHER_FPS, matcher=matcher, pool=get_pool(),
+                                telemetry=get_telemetry("watcher"))
+    return watcher
 
-        print(f"[🔍] {tmpl_name} in {region_name}: {max_val:.2f}")
+def watch_regions(w, regions):
+    for name, bbox in regions.items():
+        w.watch(name, bbox, {t: templates[t] for t in REGION_TEMPLATES.get(name, []) if t in templates},
+                MATCH_THRESHOLD)
 
+def unwatch_regions(w, regions):
+    for name in regions:
+        w.unwatch(name)
+
+def click_matches(region_name, bbox, img, scores, frame_idx):
+    found = False
+    for tmpl_name, max_val, max_loc, (h, w) in scores:
         if max_val >= MATCH_THRESHOLD:
             found = True
-            h, w = tmpl.shape
             cx, cy = bbox[0] + max_loc[0] + w // 2, bbox[1] + max_loc[1] + h // 2
-            pyautogui.moveTo(cx, cy, duration=0.1)
-            pyautogui.click()
-            print(f"[🖱] Clicked on {tmpl_name} at ({cx}, {cy})")
+            ms = click_at(cx, cy)
+            telemetry.observe("click", ms)
+            telemetry.incr("clicks")
+            print(f"[🖱] Clicked on {tmpl_name} at ({cx}, {cy}) ({ms:.1f} ms)")
 
-            cv2.rectangle(img, max_loc, (max_loc[0] + w, max_loc[1] + h), (0, 255, 0), 2)
-            debug_path = os.path.join(DEBUG_DIR, f"{frame_idx:03}_{region_name}_{tmpl_name}.jpg")
-            cv2.imwrite(debug_path, img)
-            print(f"[💾] Match saved: {debug_path}")
+            if debug_sampled(frame_idx) and img is not None:
+                debug_img = img.copy()
+                cv2.rectangle(debug_img, max_loc, (max_loc[0] + w, max_loc[1] + h), (0, 255, 0), 2)
+                debug_path = os.path.join(DEBUG_DIR, f"{frame_idx:03}_{region_name}_{tmpl_name}.jpg")
+                if debug_writer.submit(debug_path, debug_img):
+                    print(f"[💾] Match queued: {debug_path}")
 
     if not found:
-        print(f"[❌] No match found in {region_name}")
+        print(f"[🔍] No match found in {region_name}")
+
+def match_and_click(region_name, bbox, frame_idx, frame=None, frame_gray=None):
+    img, gray = region_images(bbox, frame, frame_gray)
+    scores = detector.cached(region_name, gray, lambda: score_region(region_name, gray))
+    click_matches(region_name, bbox, img, scores, frame_idx)
 
 # ==== Main loop ====
 def start_loop():
     print("[▶️] Loop automático iniciado.")
-    frame_idx = 0
+    start_exporter(TELEMETRY_FILE, TELEMETRY_INTERVAL)
     regions = get_pixel_regions()
+    try:
+        if USE_WATCHER:
+            watched_loop(regions)
+        else:
+            polling_loop(regions)
+    finally:
+        capture.release_thread()  # handle do mss desta thread (o overlay de debug também captura)
+    print("[⏹️] Loop automático encerrado.")
+
+def watched_loop(regions):
+    """Consome as detecções do watcher a cada ANALYSIS_INTERVAL (nenhuma captura própria)."""
+    w = get_watcher()
+    watch_regions(w, regions)
+    w.start()
+    frame_idx = 0
+    since = time.perf_counter()  # só vale frame capturado depois do último clique
+    try:
+        while is_running():
+            now = time.time()
+            print(f"\n[⏱️] Running analysis at {time.strftime('%H:%M:%S')}")
+            if debug_sampled(frame_idx):
+                print(regions)
+                ultimo = w.latest_frame()  # sem captura própria: sem frame ainda, sem overlay
+                if ultimo is not None:
+                    _, origin, frame = ultimo
+                    draw_region_overlay(regions, frame_idx, frame, origin)
+            clicked = False
+            for name, bbox in regions.items():
+                dets = w.detections(name, since) or []
+                scores = [(d.template, d.score, d.loc, d.shape) for d in dets]
+                click_matches(name, bbox, dets[0].image if dets else None, scores, frame_idx)
+                clicked = clicked or bool(dets)
+            if clicked:  # os cliques do tick saem do mesmo frame, como no loop antigo
+                since = time.perf_counter()
+            frame_idx += 1
+            telemetry.observe("tick", (time.time() - now) * 1000)
+            with telemetry.stage("sleep"):
+                time.sleep(max(ANALYSIS_INTERVAL - (time.time() - now), 0))
+    finally:
+        unwatch_regions(w, regions)
+        w.stop_if_idle()  # sem sequência vigiando nada: a thread não fica girando à toa
+
+def polling_loop(regions):
+    """Loop antigo: captura e casa as regiões por conta própria a cada ANALYSIS_INTERVAL."""
+    frame_idx = 0
     last_run = 0
 
     while is_running():
         now = time.time()
         if now - last_run >= ANALYSIS_INTERVAL:
             print(f"\n[⏱️] Running analysis at {time.strftime('%H:%M:%S')}")
-            if DEBUG_MODE:
+            frame, frame_gray = capture_tick() if SINGLE_CAPTURE_TICK else (None, None)
+            if debug_sampled(frame_idx):
                 print(regions)
-                draw_region_overlay(regions, frame_idx)
-            for name, bbox in regions.items():
-                match_and_click(name, bbox, frame_idx)
+                draw_region_overlay(regions, frame_idx, frame)
+            if MATCH_WORKERS > 1:
+                scored = score_regions_parallel(regions, frame, frame_gray)
+                for name, bbox in regions.items():
+                    img, scores = scored[name]
+                    click_matches(name, bbox, img, scores, frame_idx)
+            else:
+                for name, bbox in regions.items():
+                    match_and_click(name, bbox, frame_idx, frame, frame_gray)
             frame_idx += 1
             last_run = now
-        time.sleep(0.1)
-    
-    print("[⏹️] Loop automático encerrado.")
-
+            telemetry.observe("tick", (time.time() - now) * 1000)
+        with telemetry.stage("sleep"):
+            time.sleep(0.1)
@@ -1,11 +1,14 @@
 # auto_sequencer.py
 import time
 import threading
+import uuid
 import cv2
 import auto_bot
+from frame_change import ChangeDetector
+from telemetry import get_telemetry, start_exporter
 from auto_bot import (
     capture_region, get_pixel_regions,
-    MATCH_THRESHOLD, pyautogui
+    MATCH_THRESHOLD, click_at
 )
 
 # ----------------------------
@@ -20,9 +23,28 @@ from auto_bot import (
 #     optional: bool (True = tenta 1x e segue se não achar; attempts é ignorado)
 #     attempts: int|None (apenas para optional=False; None = loop infinito)
 #     templates: Optional[List[str]] (override: nomes de templates a procurar; se ausente -> usa [region])
+#     max_wait: float (s; espera máx. pela transição após o clique; padrão TRANSITION_MAX_WAIT)
+#     skippable: bool (True = a antecipação pode pular este passo; padrão = "skippable" da
+#                sequência, que por sua vez é False)
+#
+# Antecipação (opt-in): a cada tentativa, o passo atual e os LOOKAHEAD_STEPS seguintes são
+# casados no mesmo frame. Se o atual não aparece mas um seguinte já está na tela (ex.: um
+# clique anterior também avançou a UI), a sequência pula direto para ele — desde que todos os
+# passos pulados sejam skippable. Passos com efeito (confirmar, comprar, enviar) ficam de fora.
+# Um passo cuja região/template já aparece antes na sequência nunca dispara salto: o botão
+# ainda na tela pode ser o da etapa anterior, e não o da seguinte.
+#
+# Depois do clique, o passo termina assim que a tela reagir: a região clicada mudou ou o
+# template do próximo passo já está visível. Sem transição em `max_wait`, segue assim mesmo.
+TRANSITION_MAX_WAIT = 2.0  # s (era o sleep fixo entre passos)
+TRANSITION_POLL = 0.03  # s entre verificações da transição
+TRANSITION_TOL = 25.0  # variação mínima (níveis de cinza numa célula) p/ contar como mudança
+STEP_POLL_INTERVAL = 0.1  # s entre tentativas de achar o passo
+LOOKAHEAD_STEPS = 2  # passos seguintes casados junto com o atual (0 = sem antecipação)
 SEQUENCE_REGISTRY = {
     "missoes": {
         "assets_dir": "assets/missao",
+        "skippable": True,  # só navegação até o aceite (o último passo nunca é pulado)
         "steps": [
             {"region": "init_mission",  "label": "imagem0", "optional": False, "attempts": None},
             {"region": "mission_board", "label": "imagem1", "optional": False,  "attempts": None},  # attempts ignorado
@@ -56,59 +78,233 @@ SEQUENCE_REGISTRY = {
 # ----------------------------
 # CORE DA EXECUÇÃO
 # ----------------------------
+telemetry = get_telemetry("auto_sequencer")
+transitions = ChangeDetector(tol=TRANSITION_TOL)  # miniatura de cada região no instante do clique
+last_transitions = {}  # (sequência, label) -> última transição observada (ms)
+
+
+def _capture_gray(region_name, regions):
+    with telemetry.stage("capture"):
+        img = capture_region(regions[region_name])
+    with telemetry.stage("cvt"):
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-def _find_and_click(region_name, template_names, regions):
-    bbox = regions[region_name]
-    img = capture_region(bbox)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
+def _locate(region_name, template_names, regions, gray):
+    """Centro (tela) e nome do primeiro template acima do limiar na região; None se nenhum."""
+    bbox = regions[region_name]
     for tmpl_name in template_names:
         tmpl = auto_bot.templates.get(tmpl_name)
         if tmpl is None:
             continue
-        res = cv2.matchTemplate(gray, tmpl, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        with telemetry.stage("match"):
+            max_val, max_loc = auto_bot.matcher.match(gray, tmpl)
+        if max_loc is None:
+            continue
 
         print(f"[🔍] {tmpl_name} in {region_name}: {max_val:.2f}")
         if max_val >= MATCH_THRESHOLD:
             h, w = tmpl.shape
-            cx = bbox[0] + max_loc[0] + w // 2
-            cy = bbox[1] + max_loc[1] + h // 2
-            pyautogui.moveTo(cx, cy, duration=0.1)
-            pyautogui.click()
-            print(f"[🖱] Clicked on {tmpl_name} at ({cx}, {cy})")
-            return True
-    return False
+            return bbox[0] + max_loc[0] + w // 2, bbox[1] + max_loc[1] + h // 2, tmpl_name
+    return None
+
+
+def _templates_of(step):
+    # Se o passo forneceu 'templates', usa-os; senão, procura pelo nome da região
+    return step.get("templates") or [step["region"]]
+
+
+def _label_of(step):
+    return step.get("label", step["region"])
 
 
-def _wait_and_click(region_name, template_names, regions, optional=False, attempts=None, sleep_between=0.2):
+def _repeats_earlier(steps, j):
+    """O passo `j` usa a mesma região ou um template de algum passo anterior?"""
+    tmpls = set(_templates_of(steps[j]))
+    return any(steps[k]["region"] == steps[j]["region"] or tmpls & set(_templates_of(steps[k]))
+               for k in range(j))
+
+
+def _lookahead(steps, idx, skippable=False):
+    """Índices casados na tentativa do passo `idx`: ele e até LOOKAHEAD_STEPS seguintes,
+    parando antes de pular um passo que não é skippable (`skippable` = padrão da sequência)
+    e sem incluir passos que repetem região/template de um passo anterior."""
+    candidates = [idx]
+    for j in range(idx + 1, min(idx + LOOKAHEAD_STEPS, len(steps) - 1) + 1):
+        if not steps[j - 1].get("skippable", skippable):
+            break
+        if not _repeats_earlier(steps, j):
+            candidates.append(j)
+    return candidates
+
+
+def _find_and_click(candidates, steps, regions):
+    """
+    Captura UMA vez o retângulo que cobre as regiões dos `candidates` e clica o primeiro
+    passo visível, na ordem da lista (o atual tem prioridade). Devolve o índice clicado ou None.
     """
+    bboxes = [regions[steps[i]["region"]] for i in candidates]
+    x1, y1 = min(b[0] for b in bboxes), min(b[1] for b in bboxes)
+    x2, y2 = max(b[2] for b in bboxes), max(b[3] for b in bboxes)
+    with telemetry.stage("capture"):
+        img = capture_region((x1, y1, x2, y2))
+    with telemetry.stage("cvt"):
+        gray_all = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    for i in candidates:
+        region_name = steps[i]["region"]
+        bx1, by1, bx2, by2 = regions[region_name]
+        gray = gray_all[by1 - y1:by2 - y1, bx1 - x1:bx2 - x1]
+        found = _locate(region_name, _templates_of(steps[i]), regions, gray)
+        if found is None:
+            continue
+        cx, cy, tmpl_name = found
+        transitions.store(region_name, transitions.thumbnail(gray), None)  # "antes" do clique
+        ms = click_at(cx, cy)
+        telemetry.observe("click", ms)
+        print(f"[🖱] Clicked on {tmpl_name} at ({cx}, {cy}) ({ms:.1f} ms)")
+        return i
+    return None
+
+
+# Com auto_bot.USE_WATCHER, os passos não capturam a tela: o watcher vigia o passo atual
+# e os seguintes (chave "seq:<execução>:<índice>") e a sequência só espera a detecção
+# publicada. O id da execução impede que duas sequências simultâneas desfaçam os watches
+# uma da outra.
+def _step_key(run, idx):
+    return f"seq:{run}:{idx}"
+
+
+def _watch_steps(watcher, run, steps, regions, first, last):
+    """Deixa o watcher vigiando exatamente os passos first..last desta execução e garante
+    que ele está rodando (outro consumidor pode tê-lo parado com stop_if_idle)."""
+    for idx, step in enumerate(steps):
+        key = _step_key(run, idx)
+        if first <= idx <= last:
+            if not watcher.is_watching(key):
+                watcher.watch(key, regions[step["region"]],
+                              {n: auto_bot.templates[n] for n in _templates_of(step) if n in auto_bot.templates},
+                              MATCH_THRESHOLD)
+        else:
+            watcher.unwatch(key)
+    watcher.start()  # depois do watch: um stop_if_idle concorrente já não o acha ocioso
+
+
+def _await_and_click(watcher, run, candidates, steps, optional=False, attempts=None,
+                     sleep_between=STEP_POLL_INTERVAL, since=None):
+    """Mesmas regras de _wait_and_click, esperando a detecção do watcher em vez de capturar."""
+    region_name = steps[candidates[0]]["region"]
+    if optional:
+        timeout = 2.0 / watcher.fps  # um frame novo, com folga
+    elif attempts is None:
+        timeout = None
+    else:
+        timeout = attempts * sleep_between
+    keys = [_step_key(run, i) for i in candidates]
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    while True:
+        restante = None if deadline is None else max(deadline - time.perf_counter(), 0.0)
+        det = watcher.wait_any(keys, restante, since=since)
+        if det is not None or watcher.running or restante == 0.0:
+            break
+        watcher.start()  # parado no meio da espera: religa e continua esperando
+    if det is None:
+        if optional:
+            print(f"[➡️] Passo opcional '{region_name}' não encontrado (1 tentativa).")
+        elif timeout is not None:
+            print(f"[↻] '{region_name}' não apareceu em {timeout:.1f} s")
+        return None
+    idx = candidates[keys.index(det.key)]
+    gray = cv2.cvtColor(det.image, cv2.COLOR_BGR2GRAY)
+    transitions.store(steps[idx]["region"], transitions.thumbnail(gray), None)  # "antes" do clique
+    ms = click_at(*det.center)
+    telemetry.observe("click", ms)
+    print(f"[🖱] Clicked on {det.template} at {det.center} ({ms:.1f} ms, "
+          f"frame de {(time.perf_counter() - det.timestamp) * 1000:.0f} ms atrás)")
+    return idx
+
+
+def _wait_for_transition(region_name, regions, next_step=None, max_wait=TRANSITION_MAX_WAIT,
+                         watcher=None, key=None, next_key=None):
+    """
+    Espera a tela reagir ao clique em `region_name`: a região mudou em relação ao frame
+    do clique, ou o template do próximo passo já aparece na região dele.
+    Com watcher, não captura nada: compara os recortes de `key` (o passo clicado) que o
+    watcher publica a cada frame e basta uma detecção de `next_key` depois do clique.
+    Devolve (ms até a transição, motivo) ou (None, None) se passar de `max_wait`.
+    """
+    inicio = time.perf_counter()
+    if watcher is not None:
+        visto = inicio
+        while True:
+            restante = max_wait - (time.perf_counter() - inicio)
+            novo = watcher.wait_frame(key, restante, since=visto) if restante > 0 else None
+            if novo is None:
+                if restante > 0 and not watcher.running:
+                    watcher.start()  # parado por outro consumidor: religa e segue esperando
+                    continue
+                return None, None
+            visto, img = novo
+            ms = (time.perf_counter() - inicio) * 1000
+            with telemetry.stage("cvt"):
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            if transitions.changed(region_name, transitions.thumbnail(gray)):
+                return ms, "região mudou"
+            if next_key is not None and watcher.latest(next_key, since=inicio):
+                return ms, "próximo passo visível"
+
+    while True:
+        with telemetry.stage("sleep"):
+            time.sleep(TRANSITION_POLL)
+        ms = (time.perf_counter() - inicio) * 1000
+        gray = _capture_gray(region_name, regions)
+        if transitions.changed(region_name, transitions.thumbnail(gray)):
+            return ms, "região mudou"
+        if next_step is not None:
+            next_region = next_step["region"]
+            next_gray = gray if next_region == region_name else _capture_gray(next_region, regions)
+            if _locate(next_region, _templates_of(next_step), regions, next_gray):
+                return ms, "próximo passo visível"
+        if ms >= max_wait * 1000:
+            return None, None
+
+
+def _wait_and_click(candidates, steps, regions, optional=False, attempts=None,
+                    sleep_between=STEP_POLL_INTERVAL):
+    """
+    Procura o passo `candidates[0]` (e, por antecipação, os demais candidatos).
+    Devolve o índice do passo clicado ou None.
     Regras:
       - optional=True -> attempts é ignorado; tenta 1 vez; se falhar, segue o fluxo.
       - optional=False:
           * attempts=None -> tenta infinitamente até encontrar
           * attempts=N    -> tenta N vezes; se falhar, aborta sequência
     """
+    region_name = steps[candidates[0]]["region"]
     if optional:
-        success = _find_and_click(region_name, template_names, regions)
-        if not success:
+        clicked = _find_and_click(candidates, steps, regions)
+        if clicked is None:
             print(f"[➡️] Passo opcional '{region_name}' não encontrado (1 tentativa).")
-        return success
+        return clicked
 
     # Obrigatório
     if attempts is None:
         # loop infinito
         while True:
-            if _find_and_click(region_name, template_names, regions):
-                return True
-            time.sleep(sleep_between)
+            clicked = _find_and_click(candidates, steps, regions)
+            if clicked is not None:
+                return clicked
+            with telemetry.stage("sleep"):
+                time.sleep(sleep_between)
     else:
         for i in range(1, attempts + 1):
-            if _find_and_click(region_name, template_names, regions):
-                return True
+            clicked = _find_and_click(candidates, steps, regions)
+            if clicked is not None:
+                return clicked
             print(f"[↻] Tentativa obrigatória {i}/{attempts} falhou para '{region_name}'")
-            time.sleep(sleep_between)
-        return False
+            with telemetry.stage("sleep"):
+                time.sleep(sleep_between)
+        return None
 
 
 def run_sequence(sequence_name: str):
@@ -127,39 +323,79 @@ def run_sequence(sequence_name: str):
     # Carrega templates específicos da sequência
     try:
         auto_bot.templates = auto_bot.load_templates(assets_dir)
+        auto_bot.detector.reset()
         print(f"[✅] Templates carregados para '{sequence_name}' a partir de '{assets_dir}'.")
     except Exception as e:
         print(f"[❌] Erro ao carregar templates da sequência '{sequence_name}': {e}")
         return
 
     regions = get_pixel_regions()
+    start_exporter(auto_bot.TELEMETRY_FILE, auto_bot.TELEMETRY_INTERVAL)
+    watcher = auto_bot.get_watcher() if auto_bot.USE_WATCHER else None
+    run = uuid.uuid4().hex[:8]  # namespace das chaves desta execução no watcher
     print(f"[🚀] Iniciando sequência '{sequence_name}'...")
+    inicio_seq = time.perf_counter()
+    since = inicio_seq  # com watcher: só vale frame capturado depois do último clique
 
-    for step in steps:
-        region = step["region"]
-        label = step.get("label", region)
-        optional = bool(step.get("optional", False))
-        attempts = step.get("attempts", None)
+    try:
+        idx = 0
+        while idx < len(steps):
+            step = steps[idx]
+            label = _label_of(step)
+            optional = bool(step.get("optional", False))
+            attempts = step.get("attempts", None)
+            candidates = _lookahead(steps, idx, seq.get("skippable", False))
 
-        # Se o passo forneceu 'templates', usa-os; senão, procura pelo nome da região
-        template_names = step.get("templates") or [region]
+            print(f"[⏳] Aguardando: {label} ({'opcional' if optional else 'obrigatório'})")
+            inicio_passo = time.perf_counter()
 
-        print(f"[⏳] Aguardando: {label} ({'opcional' if optional else 'obrigatório'})")
+            if watcher is not None:
+                # candidatos + o passo seguinte ao último deles (usado na detecção de transição)
+                _watch_steps(watcher, run, steps, regions, idx, min(candidates[-1] + 1, len(steps) - 1))
+                clicked = _await_and_click(watcher, run, candidates, steps, optional, attempts, since=since)
+            else:
+                clicked = _wait_and_click(candidates, steps, regions, optional=optional, attempts=attempts)
 
-        found = _wait_and_click(
-            region_name=region,
-            template_names=template_names,
-            regions=regions,
-            optional=optional,
-            attempts=attempts
-        )
+            telemetry.observe("step", (time.perf_counter() - inicio_passo) * 1000)
+            if clicked is None:
+                if not optional:
+                    telemetry.incr("abortadas")
+                    print(f"[❌] Passo obrigatório '{label}' não foi encontrado. Sequência abortada.")
+                    return
+                idx += 1
+                continue  # opcional não achado: nada foi clicado, não há transição a esperar
+            since = time.perf_counter()
 
-        if not found and not optional:
-            print(f"[❌] Passo obrigatório '{label}' não foi encontrado. Sequência abortada.")
-            return
+            if clicked > idx:
+                telemetry.incr("saltos")
+                pulados = ", ".join(_label_of(passo) for passo in steps[idx:clicked])
+                print(f"[⏭️] '{_label_of(steps[clicked])}' já estava visível; pulando {pulados}.")
+            step = steps[clicked]
+            label = _label_of(step)
+            next_idx = clicked + 1
+            next_step = steps[next_idx] if next_idx < len(steps) else None
 
-        time.sleep(2)  # tempo para transições visuais
+            max_wait = step.get("max_wait", TRANSITION_MAX_WAIT)
+            ms, motivo = _wait_for_transition(step["region"], regions, next_step, max_wait, watcher,
+                                              _step_key(run, clicked),
+                                              _step_key(run, next_idx) if next_step else None)
+            if ms is None:
+                telemetry.incr("transition_timeouts")
+                print(f"[⌛] {label}: nenhuma transição em {max_wait:.1f} s; seguindo.")
+            else:
+                telemetry.observe("transition", ms)
+                last_transitions[(sequence_name, label)] = ms
+                print(f"[⚡] {label}: transição em {ms:.0f} ms ({motivo})")
+            idx = next_idx
+    finally:
+        if watcher is not None:
+            for idx in range(len(steps)):
+                watcher.unwatch(_step_key(run, idx))
+            watcher.stop_if_idle()  # o auto_bot, se iniciado a seguir, religa o watcher
+        auto_bot.capture.release_thread()  # handle de captura desta thread
 
+    telemetry.observe("sequence", (time.perf_counter() - inicio_seq) * 1000)
+    telemetry.incr("concluidas")
     print("[✅] Sequência concluída com sucesso. Iniciando auto_bot...")
     auto_bot.set_running(True)
     threading.Thread(target=auto_bot.start_loop, daemon=True).start()
@@ -0,0 +1,86 @@
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+import cv2
+
+
+class DebugWriter:
+    """
+    Grava as imagens de debug numa thread de fundo.
+    A fila é limitada: se o disco não acompanhar, o frame novo é descartado (nunca bloqueia
+    o bot). Cada pasta tem uma cota em MB; ao passar dela, os arquivos mais antigos são apagados.
+    """
+
+    def __init__(self, max_queue=16, quota_mb=200, jpeg_quality=80):
+        self.quota_bytes = int(quota_mb * 1024 * 1024)
+        self.jpeg_quality = jpeg_quality
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._folders = {}  # pasta -> [OrderedDict(path -> size), total_bytes]
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, path, img):
+        """Enfileira `img` para `path`; retorna False se a fila estava cheia (frame descartado)."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((path, img))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="debug-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            path, img = self._queue.get()
+            try:
+                if cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]):
+                    self.written += 1
+                    self._account(path)
+            except Exception as e:
+                print(f"[⚠️] Debug writer failed on {path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _folder_state(self, folder):
+        state = self._folders.get(folder)
+        if state is None:
+            # primeira gravação nesta pasta: indexa o que já existe, do mais antigo ao mais novo
+            entries = []
+            for entry in os.scandir(folder):
+                if entry.is_file():
+                    st = entry.stat()
+                    entries.append((st.st_mtime, entry.path, st.st_size))
+            entries.sort()
+            files = OrderedDict((p, size) for _, p, size in entries)
+            state = [files, sum(files.values())]
+            self._folders[folder] = state
+        return state
+
+    def _account(self, path):
+        folder = os.path.dirname(path) or "."
+        state = self._folder_state(folder)
+        files = state[0]
+        size = os.path.getsize(path)
+        state[1] += size - files.pop(path, 0)  # arquivo sobrescrito conta uma vez só
+        files[path] = size
+        while state[1] > self.quota_bytes and len(files) > 1:
+            old_path, old_size = files.popitem(last=False)
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+            state[1] -= old_size
+
+    def flush(self):
+        """Espera a fila esvaziar (útil ao encerrar)."""
+        self._queue.join()
@@ -0,0 +1,69 @@
+from __future__ import annotations
+from typing import Any, Callable, Hashable, Optional
+
+import cv2
+import numpy as np
+
+
+class ChangeDetector:
+    """
+    Detector barato de mudança por ROI.
+    Cada ROI vira uma miniatura em cinza (média de blocos `cell`×`cell`); se nenhuma célula
+    variou mais que `tol` níveis desde o último cálculo, o resultado anterior é reaproveitado
+    e o template matching não roda. A diferença MÁXIMA (e não a média) é usada para que um
+    botão pequeno aparecendo numa tela grande ainda conte como mudança.
+    """
+
+    def __init__(self, cell: int = 8, tol: float = 6.0):
+        self.cell = max(int(cell), 1)
+        self.tol = tol
+        self._thumbs: dict[Hashable, np.ndarray] = {}
+        self._results: dict[Hashable, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def thumbnail(self, img: np.ndarray) -> np.ndarray:
+        """Miniatura em cinza da imagem (pode ser calculada uma vez e reutilizada)."""
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        h, w = gray.shape[:2]
+        size = (max(w // self.cell, 1), max(h // self.cell, 1))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def changed(self, key: Hashable, thumb: np.ndarray) -> bool:
+        prev = self._thumbs.get(key)
+        if prev is None or prev.shape != thumb.shape:
+            return True
+        return int(np.abs(thumb - prev).max()) > self.tol
+
+    def cached(self, key: Hashable, img: Optional[np.ndarray], compute: Callable[[], Any],
+               thumb: Optional[np.ndarray] = None) -> Any:
+        """Devolve o resultado anterior de `key` se a ROI não mudou; senão roda `compute()`."""
+        if thumb is None:
+            thumb = self.thumbnail(img)
+        hit, result = self.lookup(key, thumb)
+        if hit:
+            return result
+        result = compute()
+        self.store(key, thumb, result)
+        return result
+
+    def lookup(self, key: Hashable, thumb: np.ndarray) -> tuple[bool, Any]:
+        """(True, resultado anterior) se `key` não mudou; (False, None) se precisa recalcular."""
+        if key in self._results and not self.changed(key, thumb):
+            self.hits += 1
+            return True, self._results[key]
+        return False, None
+
+    def store(self, key: Hashable, thumb: np.ndarray, result: Any) -> None:
+        """Guarda o resultado recém-calculado de `key` junto com a miniatura usada."""
+        self.misses += 1
+        self._thumbs[key] = thumb
+        self._results[key] = result
+
+    def reset(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._thumbs.clear()
+            self._results.clear()
+        else:
+            self._thumbs.pop(key, None)
+            self._results.pop(key, None)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+import logging
+import queue
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from typing import NamedTuple, Optional
+
+DEBUG, INFO, WARNING, ERROR = logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR
+
+# nível deduzido do prefixo das mensagens (convenção dos bots: "[!] ...", "[⚠️] ...")
+PREFIX_LEVELS = (
+    ("[❌]", ERROR), ("⛔", ERROR),
+    ("[!]", WARNING), ("[⚠️]", WARNING), ("⚠️", WARNING),
+    ("[🔍]", DEBUG),
+)
+
+
+def level_of(msg: str) -> int:
+    texto = msg.lstrip()
+    for prefixo, level in PREFIX_LEVELS:
+        if texto.startswith(prefixo):
+            return level
+    return INFO
+
+
+class LogRecord(NamedTuple):
+    created: float
+    level: int
+    msg: str
+    thread: str
+
+
+class LogSink:
+    """
+    Destino de log seguro entre threads. Quem loga (threads dos bots) só enfileira — nunca
+    toca em widget nem espera o terminal; a UI chama `drain()` no ritmo dela (via `after()`)
+    e recebe um lote. Mensagens abaixo de `level` são descartadas na origem; com a fila
+    cheia, a linha é descartada e contada (o bot não trava por causa do log).
+    Com `path`, o lote drenado também vai para um arquivo rotativo.
+    """
+
+    def __init__(self, level: int = INFO, max_queue: int = 5000, path: Optional[str] = None,
+                 max_bytes: int = 1_000_000, backups: int = 3):
+        self.level = level
+        self._queue: queue.Queue[LogRecord] = queue.Queue(maxsize=max_queue)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._file: Optional[RotatingFileHandler] = None
+        if path:
+            self._file = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            self._file.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s [%(threadName)s] %(message)s"))
+
+    def __call__(self, msg: str, level: Optional[int] = None) -> None:
+        """Mesma assinatura do `log` dos bots; o nível sai do prefixo se não for informado."""
+        level = level_of(msg) if level is None else level
+        if level < self.level:
+            return
+        try:
+            self._queue.put_nowait(LogRecord(time.time(), level, msg, threading.current_thread().name))
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+
+    def drain(self, max_batch: int = 500) -> list[LogRecord]:
+        """Tira até `max_batch` registros da fila (sem bloquear) e os grava no arquivo, se houver."""
+        lote = []
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            lote.append(LogRecord(time.time(), WARNING, f"[⚠️] {dropped} linhas de log descartadas (fila cheia).",
+                                  threading.current_thread().name))
+        try:
+            while len(lote) < max_batch:
+                lote.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        if self._file is not None:
+            for rec in lote:
+                self._write_file(rec)
+            self._file.flush()
+        return lote
+
+    def _write_file(self, rec: LogRecord) -> None:
+        record = logging.LogRecord("roxbot", rec.level, "", 0, rec.msg, None, None)
+        record.created, record.threadName = rec.created, rec.thread
+        record.msecs = (rec.created % 1) * 1000
+        self._file.handle(record)
+
+    @staticmethod
+    def format(rec: LogRecord) -> str:
+        return f"{time.strftime('%H:%M:%S', time.localtime(rec.created))} {rec.msg}"
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+class SinkWriter:
+    """
+    Objeto tipo arquivo para `sys.stdout = SinkWriter(sink)`: junta os pedaços que o `print`
+    escreve separadamente (texto, depois "\\n") por thread e envia uma linha por vez ao sink.
+    """
+
+    def __init__(self, sink: LogSink):
+        self.sink = sink
+        self._local = threading.local()
+
+    def write(self, text: str) -> int:
+        buf = getattr(self._local, "buf", "") + text
+        *linhas, self._local.buf = buf.split("\n")
+        for linha in linhas:
+            if linha.strip():
+                self.sink(linha)
+        return len(text)
+
+    def flush(self) -> None:
+        buf = getattr(self._local, "buf", "")
+        if buf.strip():
+            self.sink(buf)
+        self._local.buf = ""
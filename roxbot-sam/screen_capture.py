@@ -0,0 +1,76 @@
+from __future__ import annotations
+import threading
+from typing import Optional
+
+import cv2
+import mss
+import numpy as np
+
+from frame_source import FrameSource
+
+
+class ScreenCapture(FrameSource):
+    """
+    Serviço de captura de tela de longa duração compartilhado pelos bots.
+    Mantém UM handle mss por thread (o mss não é seguro entre threads) e devolve
+    frames BGR da tela cheia ou de uma ROI, sem abrir/fechar contexto a cada chamada.
+    """
+
+    def __init__(self, monitor_index: int = 1):
+        self.monitor_index = monitor_index
+        self._local = threading.local()
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+        return sct
+
+    def monitor(self, index: Optional[int] = None) -> dict:
+        """Retorna o dicionário do monitor (left/top/width/height) do mss."""
+        idx = self.monitor_index if index is None else index
+        return dict(self._sct().monitors[idx])
+
+    def grab(self, region: Optional[tuple[int, int, int, int]] = None) -> np.ndarray:
+        """Captura `region` = (left, top, width, height) em coordenadas de tela; None = monitor inteiro."""
+        if region is None:
+            mon = self.monitor()
+        else:
+            mon = {"left": int(region[0]), "top": int(region[1]),
+                   "width": int(region[2]), "height": int(region[3])}
+        shot = np.asarray(self._sct().grab(mon))
+        return cv2.cvtColor(shot, cv2.COLOR_BGRA2BGR)
+
+    def frame(self) -> np.ndarray:
+        return self.grab()
+
+    def grab_bbox(self, bbox: tuple[int, int, int, int]) -> np.ndarray:
+        """Mesmo que grab(), mas recebendo (x1, y1, x2, y2)."""
+        x1, y1, x2, y2 = bbox
+        return self.grab((x1, y1, x2 - x1, y2 - y1))
+
+    def release_thread(self) -> None:
+        """Fecha o handle da thread atual (as demais threads mantêm o seu). No Windows cada
+        handle segura DCs do GDI, e só a thread que o abriu pode soltá-los: todo loop que
+        captura chama isto num `finally`, senão cada Iniciar/Parar vaza um handle."""
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+    def close(self) -> None:
+        self.release_thread()
+
+
+_default: Optional[ScreenCapture] = None
+_default_lock = threading.Lock()
+
+
+def get_capture() -> ScreenCapture:
+    """Instância única do serviço, criada sob demanda."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ScreenCapture()
+        return _default
@@ -0,0 +1,160 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Stage:
+    __slots__ = ("samples", "count", "total")
+
+    def __init__(self, window: int):
+        self.samples: deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+
+class Telemetry:
+    """
+    Cronômetros por etapa de um loop (captura, conversão de cor, matching, OCR, clique,
+    espera...) e contadores de eventos. Os percentis saem das últimas `window` amostras
+    de cada etapa; soma e contagem são acumuladas desde o início, como num summary do
+    Prometheus. Seguro entre threads.
+    """
+
+    def __init__(self, bot: str, window: int = 1024):
+        self.bot = bot
+        self.window = window
+        self._stages: dict[str, _Stage] = {}
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """`with telemetry.stage("capture"): ...` mede o bloco em ms."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - t0) * 1000)
+
+    def observe(self, name: str, ms: float) -> None:
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = _Stage(self.window)
+            stage.samples.append(ms)
+            stage.count += 1
+            stage.total += ms
+
+    def incr(self, event: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[event] = self._counters.get(event, 0) + n
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> tuple[dict[str, tuple[tuple[float, ...], int, float]], dict[str, int]]:
+        """({etapa: ((p50, p95, p99), contagem, soma ms)}, {evento: contagem})."""
+        with self._lock:
+            stages = {name: (list(s.samples), s.count, s.total) for name, s in self._stages.items()}
+            counters = dict(self._counters)
+        out = {}
+        for name, (samples, count, total) in stages.items():
+            pcts = tuple(np.percentile(samples, [q * 100 for q in QUANTILES])) if samples else (0.0,) * len(QUANTILES)
+            out[name] = (pcts, count, total)
+        return out, counters
+
+    def summary(self) -> str:
+        """Resumo curto (uma linha por etapa) para mostrar na janela."""
+        stages, counters = self.snapshot()
+        if not stages and not counters:
+            return f"{self.bot}: sem dados"
+        linhas = [f"{'etapa (ms)':<10}  p50 /   p95 /   p99"]
+        linhas += [f"{name:<10}{p[0]:5.1f} / {p[1]:5.1f} / {p[2]:5.1f}  n {count}"
+                   for name, (p, count, _) in stages.items()]
+        if counters:
+            linhas.append("  ".join(f"{k} {v}" for k, v in counters.items()))
+        return "\n".join(linhas)
+
+    def prometheus_lines(self) -> tuple[list[str], list[str]]:
+        """Amostras no formato texto do Prometheus: (latências por etapa, contadores de eventos)."""
+        stages, counters = self.snapshot()
+        bot = self.bot.replace('"', "'")
+        latencias = []
+        for name, (pcts, count, total) in stages.items():
+            labels = f'bot="{bot}",stage="{name}"'
+            for q, v in zip(QUANTILES, pcts):
+                latencias.append(f'roxbot_stage_latency_ms{{{labels},quantile="{q}"}} {v:.3f}')
+            latencias.append(f"roxbot_stage_latency_ms_sum{{{labels}}} {total:.3f}")
+            latencias.append(f"roxbot_stage_latency_ms_count{{{labels}}} {count}")
+        eventos = [f'roxbot_events_total{{bot="{bot}",event="{event}"}} {n}' for event, n in counters.items()]
+        return latencias, eventos
+
+
+_registry: dict[str, Telemetry] = {}
+_registry_lock = threading.Lock()
+
+
+def get_telemetry(bot: str) -> Telemetry:
+    """Telemetria do bot `bot`, criada sob demanda (uma por nome, compartilhada)."""
+    with _registry_lock:
+        tel = _registry.get(bot)
+        if tel is None:
+            tel = _registry[bot] = Telemetry(bot)
+        return tel
+
+
+def write_prometheus(path: str) -> None:
+    """Grava as métricas de todos os bots em `path` (troca atômica: quem lê nunca vê meio arquivo)."""
+    with _registry_lock:
+        bots = list(_registry.values())
+    latencias, eventos = [], []
+    for tel in bots:
+        lat, ev = tel.prometheus_lines()
+        latencias += lat
+        eventos += ev
+    # cada família de métricas fica contígua, logo após o seu TYPE
+    texto = "\n".join([
+        "# HELP roxbot_stage_latency_ms Latência por etapa do loop (ms; quantis das últimas amostras).",
+        "# TYPE roxbot_stage_latency_ms summary",
+        *latencias,
+        "# HELP roxbot_events_total Eventos contados pelos bots.",
+        "# TYPE roxbot_events_total counter",
+        *eventos,
+    ]) + "\n"
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(tmp, path)
+
+
+_exporter: Optional[threading.Thread] = None
+
+
+def start_exporter(path: str, interval: float = 15.0, log=print) -> None:
+    """Grava `path` a cada `interval` s numa thread daemon (chamadas repetidas não duplicam)."""
+    global _exporter
+    with _registry_lock:
+        if _exporter is not None:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    write_prometheus(path)
+                except OSError as e:
+                    log(f"[!] Falha ao gravar telemetria em {path}: {e}")
+
+        _exporter = threading.Thread(target=_loop, name="telemetry-export", daemon=True)
+        _exporter.start()
+    log(f"[📊] Telemetria gravada em {path} a cada {interval:.0f} s.")
@@ -4,25 +4,26 @@ import threading
 import sys
 import auto_bot
 import auto_sequencer  # <- novo
+from log_sink import DEBUG, ERROR, INFO, WARNING, LogSink, SinkWriter
+from telemetry import get_telemetry
 
-# ==== Redirecionador de log para a interface ====
-class TextRedirector:
-    def __init__(self, text_widget):
-        self.text_widget = text_widget
+TELEMETRY_REFRESH_MS = 1000  # atualização do resumo de latências
 
-    def write(self, text):
-        self.text_widget.insert(tk.END, text)
-        self.text_widget.see(tk.END)  # Auto-scroll
-
-    def flush(self):
-        pass
+# ==== Log ====
+# os prints das threads vão para uma fila; a UI drena em lotes e mantém só as últimas linhas
+LOG_LEVEL = INFO  # DEBUG mostra também os scores de cada template ("[🔍] ...")
+LOG_DRAIN_MS = 100  # cadência do dreno da fila
+LOG_BATCH = 500  # linhas por dreno, no máximo
+LOG_MAX_LINES = 1000  # linhas mantidas na área de log
+LOG_FILE = None  # ex.: "roxbot.log" (rotativo, 1 MB x 3)
+LOG_COLORS = {DEBUG: "#9e9e9e", WARNING: "#ffca28", ERROR: "#ef5350"}
 
 # ==== Interface moderna ====
 class BotGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("RoxBot Interface")
-        self.root.geometry("520x460")
+        self.root.geometry("520x720")
         self.root.configure(bg="#1e1e1e")
         self.root.resizable(False, False)
         self.root.attributes('-topmost', True)  # Sempre no topo
@@ -30,9 +31,12 @@ class BotGUI:
         self.running = False
 
         self.build_widgets()
+        self.refresh_telemetry()
 
-        # Redireciona stdout para a interface
-        sys.stdout = TextRedirector(self.log_area)
+        # Redireciona stdout para a fila de log (drenada pela própria UI)
+        self.log_sink = LogSink(level=LOG_LEVEL, path=LOG_FILE)
+        sys.stdout = SinkWriter(self.log_sink)
+        self.drain_logs()
 
     def build_widgets(self):
         style_btn = {
@@ -71,12 +75,21 @@ class BotGUI:
         )
         self.toggle_btn.pack(pady=8)
 
+        # Resumo da telemetria (p50/p95/p99 por etapa) do AutoBot e da sequência
+        self.telemetry_label = tk.Label(
+            self.root, text="", justify=tk.LEFT, anchor="w", bg="#1e1e1e", fg="#9e9e9e",
+            font=("Consolas", 8)
+        )
+        self.telemetry_label.pack(fill=tk.X, padx=10)
+
         # Área de logs
         self.log_area = scrolledtext.ScrolledText(
             self.root, wrap=tk.WORD, height=16, bg="#121212", fg="#ffffff",
             font=("Consolas", 10), insertbackground="white"
         )
         self.log_area.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        for level, color in LOG_COLORS.items():
+            self.log_area.tag_configure(str(level), foreground=color)
 
         # Tema do ttk Combobox mais amigável no escuro (opcional simples)
         style = ttk.Style()
@@ -87,6 +100,31 @@ class BotGUI:
         style.configure("TCombobox", fieldbackground="#2b2b2b", background="#2b2b2b", foreground="#ffffff")
         style.map('TCombobox', fieldbackground=[('readonly', '#2b2b2b')])
 
+    def drain_logs(self):
+        lote = self.log_sink.drain(LOG_BATCH)
+        if lote:
+            # um insert por trecho de mesmo nível, em vez de um por print
+            trechos = []
+            for rec in lote:
+                linha = LogSink.format(rec) + "\n"
+                tag = str(rec.level) if rec.level in LOG_COLORS else ""
+                if trechos and trechos[-1][1] == tag:
+                    trechos[-1][0].append(linha)
+                else:
+                    trechos.append(([linha], tag))
+            for linhas, tag in trechos:
+                self.log_area.insert(tk.END, "".join(linhas), tag)
+            excesso = int(self.log_area.index("end-1c").split(".")[0]) - 1 - LOG_MAX_LINES
+            if excesso > 0:
+                self.log_area.delete("1.0", f"{excesso + 1}.0")
+            self.log_area.see(tk.END)  # Auto-scroll
+        self.root.after(LOG_DRAIN_MS, self.drain_logs)
+
+    def refresh_telemetry(self):
+        resumo = [f"[{nome}]\n{get_telemetry(nome).summary()}" for nome in ("auto_bot", "auto_sequencer", "watcher")]
+        self.telemetry_label.config(text="\n".join(resumo))
+        self.root.after(TELEMETRY_REFRESH_MS, self.refresh_telemetry)
+
     def toggle_loop(self):
         if not auto_bot.is_running():
             auto_bot.set_running(True)
@@ -0,0 +1,281 @@
+from __future__ import annotations
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+from frame_change import ChangeDetector
+from matcher import PyramidMatcher
+
+
+class Detection(NamedTuple):
+    key: str
+    template: str
+    score: float
+    loc: tuple[int, int]     # canto superior esquerdo do match, relativo à região
+    shape: tuple[int, int]   # (h, w) do template
+    center: tuple[int, int]  # centro do match em coordenadas de tela
+    image: np.ndarray        # recorte BGR da região no frame em que foi vista
+    timestamp: float         # time.perf_counter() do início da captura desse frame
+
+
+class _Watch:
+    __slots__ = ("bbox", "templates", "threshold", "detector")
+
+    def __init__(self, bbox, templates, threshold):
+        self.bbox = tuple(int(v) for v in bbox)
+        self.templates = dict(templates)
+        self.threshold = threshold
+        self.detector = ChangeDetector()  # região parada reaproveita os scores anteriores
+
+
+class VisionWatcher:
+    """
+    Thread única de visão. A cada frame (na FPS alvo) captura só o retângulo que cobre as
+    regiões registradas, converte para cinza uma vez e casa cada par região × template.
+    As detecções acima do limiar de cada região são publicadas com o instante do frame:
+    consumidores leem a mais recente (`detections`/`latest`), esperam por uma com timeout
+    (`wait_for`) ou recebem todo frame por callback (`subscribe`). O recorte de cada região
+    também é publicado (`frame`/`wait_frame`), com ou sem detecção: quem precisa ver a região
+    mudar (ex.: depois de um clique) compara esses recortes em vez de capturar de novo.
+    Use `since` (um time.perf_counter()) para ignorar frames capturados antes de um clique.
+    """
+
+    def __init__(self, capture, fps: float = 10.0, matcher: Optional[PyramidMatcher] = None,
+                 pool=None, telemetry=None, log: Callable[[str], None] = print):
+        self.capture = capture
+        self.fps = fps
+        self.matcher = matcher or PyramidMatcher()
+        self.pool = pool  # ThreadPoolExecutor opcional p/ casar os templates em paralelo
+        self.telemetry = telemetry
+        self.log = log
+        self.frames = 0
+        self._watches: dict[str, _Watch] = {}
+        self._published: dict[str, tuple[float, list[Detection], np.ndarray]] = {}
+        self._last_frame: Optional[tuple[float, tuple[int, int], np.ndarray]] = None
+        self._subscribers: list[Callable[[float, dict[str, list[Detection]]], None]] = []
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------- registro ----------------
+    def watch(self, key: str, bbox: tuple[int, int, int, int], templates: dict[str, np.ndarray],
+              threshold: float = 0.8) -> None:
+        """Passa a vigiar `templates` na região `bbox` = (x1, y1, x2, y2) da tela."""
+        with self._cond:
+            self._watches[key] = _Watch(bbox, templates, threshold)
+            self._published.pop(key, None)
+
+    def is_watching(self, key: str) -> bool:
+        with self._cond:
+            return key in self._watches
+
+    def unwatch(self, key: str) -> None:
+        with self._cond:
+            self._watches.pop(key, None)
+            self._published.pop(key, None)
+
+    def subscribe(self, callback: Callable[[float, dict[str, list[Detection]]], None]) -> None:
+        """`callback(instante, {região: detecções})` é chamado na thread do watcher a cada frame."""
+        with self._cond:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        with self._cond:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    # ---------------- consumo ----------------
+    def _fresh(self, key: str, since: Optional[float]) -> Optional[list[Detection]]:
+        entry = self._published.get(key)
+        if entry is None or (since is not None and entry[0] <= since):
+            return None
+        return entry[1]
+
+    def detections(self, key: str, since: Optional[float] = None) -> Optional[list[Detection]]:
+        """Detecções do último frame avaliado para `key` (lista vazia = nada acima do limiar);
+        None se a região ainda não foi avaliada depois de `since`."""
+        with self._cond:
+            return self._fresh(key, since)
+
+    def latest(self, key: str, since: Optional[float] = None) -> Optional[Detection]:
+        dets = self.detections(key, since)
+        return dets[0] if dets else None
+
+    def frame(self, key: str, since: Optional[float] = None) -> Optional[tuple[float, np.ndarray]]:
+        """(instante, recorte BGR da região) do último frame avaliado para `key`; None se a
+        região ainda não foi avaliada depois de `since`."""
+        with self._cond:
+            entry = self._published.get(key)
+            if entry is None or (since is not None and entry[0] <= since):
+                return None
+            return entry[0], entry[2]
+
+    def latest_frame(self, since: Optional[float] = None) -> Optional[tuple[float, tuple[int, int], np.ndarray]]:
+        """(instante, (x, y) do canto na tela, frame BGR) da última captura inteira — o retângulo
+        que cobre todas as regiões vigiadas; None se não houve captura depois de `since`."""
+        with self._cond:
+            entry = self._last_frame
+            if entry is None or (since is not None and entry[0] <= since):
+                return None
+            return entry
+
+    def wait_frame(self, key: str, timeout: Optional[float] = None,
+                   since: Optional[float] = None) -> Optional[tuple[float, np.ndarray]]:
+        """Bloqueia até `key` ser avaliada num frame posterior a `since` (None = expirou/parou)."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while True:
+                entry = self._published.get(key)
+                if entry is not None and (since is None or entry[0] > since):
+                    return entry[0], entry[2]
+                if not self.running:
+                    return None
+                restante = None if deadline is None else deadline - time.perf_counter()
+                if restante is not None and restante <= 0:
+                    return None
+                self._cond.wait(restante)
+
+    def wait_for(self, key: str, timeout: Optional[float] = None,
+                 since: Optional[float] = None) -> Optional[Detection]:
+        """Bloqueia até `key` ter uma detecção de um frame posterior a `since` (None = expirou)."""
+        return self.wait_any((key,), timeout, since)
+
+    def wait_any(self, keys, timeout: Optional[float] = None,
+                 since: Optional[float] = None) -> Optional[Detection]:
+        """Como `wait_for`, para várias regiões: devolve a detecção da primeira de `keys`
+        (na ordem dada) que tiver alguma no frame mais recente."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while True:
+                for key in keys:
+                    dets = self._fresh(key, since)
+                    if dets:
+                        return dets[0]
+                if not self.running:
+                    return None
+                restante = None if deadline is None else deadline - time.perf_counter()
+                if restante is not None and restante <= 0:
+                    return None
+                self._cond.wait(restante)
+
+    # ---------------- thread ----------------
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def start(self) -> None:
+        with self._cond:
+            if self.running:
+                return
+            antiga = self._thread
+        if antiga is not None:
+            antiga.join()  # parada pedida: a thread antiga sai antes de abrir outra
+        with self._cond:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="vision-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def stop_if_idle(self) -> bool:
+        """Para a thread se ninguém mais vigia nem assina nada (chamado por cada consumidor ao
+        sair). Checagem e parada sob o mesmo lock: um `watch` + `start` concorrente reabre."""
+        with self._cond:
+            if self._watches or self._subscribers:
+                return False
+            self._stop.set()
+            self._cond.notify_all()
+            return True
+
+    def _stage(self, name: str):
+        return self.telemetry.stage(name) if self.telemetry else nullcontext()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            inicio = time.perf_counter()
+            with self._cond:
+                watches = dict(self._watches)
+            if watches:
+                try:
+                    self._tick(watches, inicio)
+                except Exception as e:  # uma captura falha não derruba os consumidores
+                    self.log(f"[⚠️] Watcher: falha no frame: {e}")
+                if self.telemetry:
+                    self.telemetry.observe("tick", (time.perf_counter() - inicio) * 1000)
+            resto = 1.0 / self.fps - (time.perf_counter() - inicio)
+            if resto > 0:
+                self._stop.wait(resto)
+        self.capture.release_thread()  # o handle do mss é desta thread; a próxima abre outro
+        with self._cond:
+            self._cond.notify_all()  # acorda quem está em wait_for
+
+    def _score(self, gray: np.ndarray, name: str, tmpl: np.ndarray):
+        with self._stage("match"):
+            max_val, max_loc = self.matcher.match(gray, tmpl)
+        if max_loc is None:
+            return None
+        return name, max_val, max_loc, tmpl.shape[:2]
+
+    def _tick(self, watches: dict[str, _Watch], ts: float) -> None:
+        x1 = min(w.bbox[0] for w in watches.values())
+        y1 = min(w.bbox[1] for w in watches.values())
+        x2 = max(w.bbox[2] for w in watches.values())
+        y2 = max(w.bbox[3] for w in watches.values())
+        with self._stage("capture"):
+            frame = self.capture.grab_bbox((x1, y1, x2, y2))
+        with self._stage("cvt"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # 1) dispara o matching das regiões que mudaram (todas juntas, se houver pool)
+        pending = {}
+        for key, w in watches.items():
+            bx1, by1, bx2, by2 = w.bbox
+            img = frame[by1 - y1:by2 - y1, bx1 - x1:bx2 - x1]
+            g = gray[by1 - y1:by2 - y1, bx1 - x1:bx2 - x1]
+            thumb = w.detector.thumbnail(g)
+            hit, scores = w.detector.lookup(key, thumb)
+            if hit:
+                pending[key] = (img, thumb, scores, False)
+            elif self.pool is not None:
+                pending[key] = (img, thumb, [self.pool.submit(self._score, g, n, t)
+                                             for n, t in w.templates.items()], True)
+            else:
+                pending[key] = (img, thumb, [self._score(g, n, t) for n, t in w.templates.items()], True)
+
+        # 2) junta os scores e monta as detecções acima do limiar
+        frame_dets: dict[str, list[Detection]] = {}
+        frame_imgs: dict[str, np.ndarray] = {}
+        for key, (img, thumb, scores, novo) in pending.items():
+            w = watches[key]
+            if novo:
+                if self.pool is not None:
+                    scores = [f.result() for f in scores]
+                scores = [s for s in scores if s is not None]
+                w.detector.store(key, thumb, scores)
+            dets = []
+            for name, score, loc, (h, tw) in scores:
+                if score >= w.threshold:
+                    center = (w.bbox[0] + loc[0] + tw // 2, w.bbox[1] + loc[1] + h // 2)
+                    dets.append(Detection(key, name, score, loc, (h, tw), center, img, ts))
+            frame_dets[key] = dets
+            frame_imgs[key] = img
+
+        with self._cond:
+            for key, dets in frame_dets.items():
+                if self._watches.get(key) is watches[key]:  # ignora região trocada no meio do frame
+                    self._published[key] = (ts, dets, frame_imgs[key])
+            self._last_frame = (ts, (x1, y1), frame)
+            self.frames += 1
+            subscribers = list(self._subscribers)
+            self._cond.notify_all()
+        for callback in subscribers:
+            callback(ts, frame_dets)
@@ -0,0 +1,365 @@
+"""
+Benchmark offline dos detectores (latência e acerto), sem tela nem cliques.
+
+Reproduz os frames gravados em debug/ e frames sintéticos (assets colados sobre fundos
+reais) pelos detectores da Pesca, da Jardinagem e do auto_bot (roxbot-sam), e compara
+o resultado com a linha de base gravada em benchmark_baseline.json:
+
+    python benchmark.py                     # roda e compara (sai com código 1 se regrediu
+                                            # ou se não há linha de base para comparar)
+    python benchmark.py --write-baseline    # grava os números atuais como linha de base
+    python benchmark.py --only pesca_carretel --synthetic 100
+
+Os rótulos dos frames gravados ficam em debug/labels.json ({"arquivo.png": ["lancar", ...]}).
+O nome do arquivo não basta: `carretel_ok_roi_*`/`carretel_neg_roi_*` diz qual template o bot
+estava testando, e não o que havia na tela (há ROIs "carretel" com o botão Lançar, com o
+carretel verde, vermelho ou vazias). Corrija o JSON à mão ao adicionar frames novos.
+Latência depende da máquina: gere a linha de base no mesmo PC em que vai comparar.
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import copy
+import glob
+import io
+import json
+import os
+import sys
+import time
+from typing import Callable, Iterator, Optional
+
+import cv2
+import numpy as np
+
+from frame_source import SyntheticSource
+from input_driver import RecordingDriver
+from jardinagem import JardinagemBot
+from pesca import DecisorCarretel, PescaBot
+from template_store import TemplateStore
+
+ASSETS_DIR = "assets"
+DEBUG_DIR = "debug"
+LABELS_FILE = os.path.join(DEBUG_DIR, "labels.json")
+SAM_DIR = os.path.join("..", "roxbot-sam")
+BASELINE_FILE = "benchmark_baseline.json"
+SCALES = [0.8, 0.9, 1.0, 1.1, 1.2]
+JARDINAGEM_THRESHOLDS = (0.8, 0.7, 0.67)
+AUTO_BOT_SCREEN = (2560, 1440)  # tela fixa: o resultado não depende do monitor desta máquina
+
+# amostra: (frame BGR, {chave: centro esperado ou None se a posição não é conhecida})
+Amostra = tuple[np.ndarray, dict[str, Optional[tuple[int, int]]]]
+Detector = Callable[[np.ndarray], dict[str, tuple[int, int]]]
+
+
+class Indisponivel(Exception):
+    """O detector não tem como rodar nesta máquina (ex.: sem monitor ou sem o roxbot-sam).
+    É o único motivo aceito para pular um caso; qualquer outra exceção conta como falha."""
+
+
+def _silencioso(_msg: str) -> None:
+    pass
+
+
+def _sem_monitor(e: BaseException) -> bool:
+    """Erro do pyautogui/Xlib ao importar sem servidor gráfico (Linux sem $DISPLAY)."""
+    return (isinstance(e, KeyError) and e.args == ("DISPLAY",)) or type(e).__module__.startswith("Xlib")
+
+
+def _ler(padrao: str) -> list[np.ndarray]:
+    imgs = [cv2.imread(p) for p in sorted(glob.glob(os.path.join(DEBUG_DIR, padrao)))]
+    return [img for img in imgs if img is not None]
+
+
+def _gravados(padrao: str, chave: str) -> list[Amostra]:
+    """Frames gravados que casam com `padrao`, rotulados por debug/labels.json (sem rótulo = ignorado)."""
+    with open(LABELS_FILE, "r", encoding="utf-8") as f:
+        rotulos = json.load(f)
+    amostras = []
+    for path in sorted(glob.glob(os.path.join(DEBUG_DIR, padrao))):
+        nome = os.path.basename(path)
+        img = cv2.imread(path) if nome in rotulos else None
+        if img is not None:
+            amostras.append((img, {chave: None} if chave in rotulos[nome] else {}))
+    return amostras
+
+
+def _jitter(img: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Variação leve de brilho/contraste, como entre duas capturas da mesma tela."""
+    return cv2.convertScaleAbs(img, alpha=rng.uniform(0.95, 1.05), beta=rng.uniform(-8, 8))
+
+
+def _colar(fundo: np.ndarray, tmpl: np.ndarray, rng: np.random.Generator,
+           escala: float = 1.0, area: Optional[tuple[int, int, int, int]] = None):
+    """Cola o template (redimensionado) numa posição aleatória de `area` (x1, y1, x2, y2)."""
+    if escala != 1.0:
+        tmpl = cv2.resize(tmpl, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    h, w = tmpl.shape[:2]
+    x1, y1, x2, y2 = area or (0, 0, fundo.shape[1], fundo.shape[0])
+    if x2 - x1 < w or y2 - y1 < h:
+        return None, None
+    x = int(rng.integers(x1, x2 - w + 1))
+    y = int(rng.integers(y1, y2 - h + 1))
+    frame = fundo.copy()
+    frame[y:y + h, x:x + w] = tmpl
+    return _jitter(frame, rng), (x + w // 2, y + h // 2)
+
+
+def _sinteticos(fundos: list[np.ndarray], tmpl: np.ndarray, chave: str, n: int,
+                rng: np.random.Generator, escalas=(1.0,)) -> Iterator[Amostra]:
+    """Metade com o template colado (positivos), metade só o fundo (negativos)."""
+    for i in range(n):
+        fundo = fundos[i % len(fundos)]
+        if i % 2:
+            yield _jitter(fundo, rng), {}
+            continue
+        frame, centro = _colar(fundo, tmpl, rng, float(rng.choice(escalas)))
+        if frame is not None:
+            yield frame, {chave: centro}
+
+
+# ---------------------- detectores ----------------------
+def caso_pesca_lancar(store: TemplateStore, rng, args):
+    bot = PescaBot(log=_silencioso, assets_dir=ASSETS_DIR, templates=store,
+                   input_driver=RecordingDriver())
+    tmpl = store.get(bot.routine_folder, "lancar.png")
+    thr = bot.config["thresholds"]["lancar"]
+
+    def detectar(frame):
+        score, centro = bot._pontuar(frame, tmpl)
+        return {"lancar": centro} if score >= thr else {}
+
+    reais = _gravados("*_roi_*.png", "lancar") + _gravados("wizard_full_*.png", "lancar")
+    fundos = [img for img, esperado in _gravados("carretel_*_roi_*.png", "lancar") if not esperado]
+    return detectar, reais + list(_sinteticos(fundos, tmpl, "lancar", args.synthetic, rng))
+
+
+def caso_pesca_carretel(store: TemplateStore, rng, args):
+    bot = PescaBot(log=_silencioso, assets_dir=ASSETS_DIR, templates=store,
+                   input_driver=RecordingDriver())
+    tmpl_ok = store.get(bot.routine_folder, "carretel_verde.png")
+    tmpl_neg = store.get(bot.routine_folder, "carretel.png")
+    # decisão de um frame só: sem exigir frames seguidos nem cooldown
+    config = copy.deepcopy(bot.config)
+    config["timing"].update(ok_frames_required=1, click_cooldown_ms=0)
+
+    def detectar(frame):
+        ratio, ok, neg, centro = bot._avaliar_carretel(frame, tmpl_ok, tmpl_neg)
+        return {"carretel_verde": centro} if DecisorCarretel(config).avaliar(ok, neg, ratio) else {}
+
+    amostras = _gravados("*_roi_*.png", "carretel_verde")
+    # fundos p/ os sintéticos: ROIs sem carretel verde (podem ter o Lançar ou o carretel normal)
+    fundos = [img for img, esperado in amostras if not esperado]
+    amostras += _sinteticos(fundos, tmpl_ok, "carretel_verde", args.synthetic, rng)
+    # carretel normal (ainda não verde) colado: não pode disparar o clique
+    for i in range(args.synthetic // 2):
+        frame, _ = _colar(fundos[i % len(fundos)], tmpl_neg, rng)
+        if frame is not None:
+            amostras.append((frame, {}))
+    return detectar, amostras
+
+
+def _caso_jardinagem(asset: str):
+    def caso(store: TemplateStore, rng, args):
+        bot = JardinagemBot(log=_silencioso, ocr_engine=None, assets_dir=ASSETS_DIR,
+                            scales=SCALES, templates=store, input_driver=RecordingDriver())
+        tmpl = store.get(bot.routine_folder, asset)
+
+        def detectar(frame):
+            centro, _ = bot._buscar_imagem(frame, asset, JARDINAGEM_THRESHOLDS)
+            return {asset: centro} if centro else {}
+
+        # uma escala de UI por execução, como numa sessão real (o calibrador trava nela)
+        return detectar, list(_sinteticos(_ler("wizard_full_*.png"), tmpl, asset, args.synthetic,
+                                          rng, (args.ui_scale,)))
+    return caso
+
+
+def caso_auto_bot(store: TemplateStore, rng, args):
+    """Um template de missão colado na sua região; conta acertos por (região, template)."""
+    cwd = os.getcwd()
+    sam_dir = os.path.abspath(SAM_DIR)
+    if not os.path.isfile(os.path.join(sam_dir, "auto_bot.py")):
+        raise Indisponivel(f"roxbot-sam não encontrado em {sam_dir}")
+    sys.path.insert(0, sam_dir)
+    # o import já lê o tamanho da tela: um replay de debug/ evita precisar de monitor
+    os.environ.setdefault("ROXBOT_FRAME_SOURCE", os.path.abspath(DEBUG_DIR))
+    os.chdir(sam_dir)  # o auto_bot carrega assets/ e cria as pastas de debug relativas
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import auto_bot
+            auto_bot.set_frame_source(SyntheticSource(AUTO_BOT_SCREEN))
+    except ImportError as e:  # dependência opcional do roxbot-sam não instalada
+        raise Indisponivel(f"{type(e).__name__}: {e}") from e
+    except Exception as e:
+        if _sem_monitor(e):
+            raise Indisponivel(f"sem monitor ({type(e).__name__}: {e})") from e
+        raise
+    finally:
+        os.chdir(cwd)
+    auto_bot.DEBUG_MODE = False
+    regions = auto_bot.get_pixel_regions()
+    fundos = [cv2.resize(img, AUTO_BOT_SCREEN, interpolation=cv2.INTER_AREA) for img in _ler("wizard_full_*.png")]
+    pares = [(r, t) for r, nomes in auto_bot.REGION_TEMPLATES.items() for t in nomes
+             if r in regions and t in auto_bot.templates]
+
+    def detectar(frame):
+        auto_bot.detector.reset()  # mede o matching, não o cache de ROIs paradas
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultados = auto_bot.score_regions_parallel(regions, frame, gray)
+        achados = {}
+        for region, (_, scores) in resultados.items():
+            x1, y1 = regions[region][:2]
+            for tmpl_name, max_val, max_loc, (h, w) in scores:
+                if max_val >= auto_bot.MATCH_THRESHOLD:
+                    achados[f"{region}/{tmpl_name}"] = (x1 + max_loc[0] + w // 2, y1 + max_loc[1] + h // 2)
+        return achados
+
+    amostras: list[Amostra] = []
+    for i in range(args.synthetic):
+        fundo = fundos[i % len(fundos)]
+        if i % 4 == 3 or not pares:
+            amostras.append((_jitter(fundo, rng), {}))
+            continue
+        region, tmpl_name = pares[(i - i // 4) % len(pares)]
+        tmpl = cv2.cvtColor(auto_bot.templates[tmpl_name], cv2.COLOR_GRAY2BGR)
+        frame, centro = _colar(fundo, tmpl, rng, area=regions[region])
+        if frame is None:
+            continue
+        # regiões sobrepostas com o mesmo template também devem achá-lo
+        h, w = tmpl.shape[:2]
+        esperado = {f"{r}/{tmpl_name}": centro for r, (x1, y1, x2, y2) in regions.items()
+                    if tmpl_name in auto_bot.REGION_TEMPLATES.get(r, [])
+                    and x1 <= centro[0] - w // 2 and centro[0] - w // 2 + w <= x2
+                    and y1 <= centro[1] - h // 2 and centro[1] - h // 2 + h <= y2}
+        amostras.append((frame, esperado))
+    return detectar, amostras
+
+
+CASOS = {
+    "pesca_lancar": caso_pesca_lancar,
+    "pesca_carretel": caso_pesca_carretel,
+    "jardinagem_modal": _caso_jardinagem("modal.png"),
+    "jardinagem_button": _caso_jardinagem("button.png"),
+    "auto_bot": caso_auto_bot,
+}
+
+
+# ---------------------- medição ----------------------
+def medir(detectar: Detector, amostras: list[Amostra], tol_px: int = 10) -> dict:
+    if amostras:
+        detectar(amostras[0][0])  # aquecimento (caches de template, pool de threads)
+    tempos, tp, fp, fn = [], 0, 0, 0
+    inicio = time.perf_counter()
+    for frame, esperado in amostras:
+        t0 = time.perf_counter()
+        achados = detectar(frame)
+        tempos.append((time.perf_counter() - t0) * 1000)
+        for chave, centro in achados.items():
+            alvo = esperado.get(chave, False)
+            if alvo is False:
+                fp += 1
+            elif alvo is None or (abs(centro[0] - alvo[0]) <= tol_px and abs(centro[1] - alvo[1]) <= tol_px):
+                tp += 1
+            else:
+                fp += 1  # achou no lugar errado: conta como falso positivo e falso negativo
+                fn += 1
+        fn += sum(1 for chave in esperado if chave not in achados)
+    total = time.perf_counter() - inicio
+    p50, p95, p99 = np.percentile(tempos, [50, 95, 99]) if tempos else (0.0, 0.0, 0.0)
+    return {
+        "frames": len(amostras),
+        "p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3),
+        "fps": round(len(amostras) / total, 1) if total > 0 else 0.0,
+        "precision": round(tp / (tp + fp), 4) if tp + fp else 1.0,
+        "recall": round(tp / (tp + fn), 4) if tp + fn else 1.0,
+        "tp": tp, "fp": fp, "fn": fn,
+    }
+
+
+def comparar(atual: dict, base: dict, tol_lat: float, tol_acc: float,
+             excluidos: frozenset[str] = frozenset()) -> list[str]:
+    """Lista de regressões em relação à linha de base (vazia = tudo ok). Detector da linha
+    de base sem resultado atual (quebrou, foi renomeado...) é regressão, salvo se estiver
+    em `excluidos` (fora do --only ou Indisponivel nesta máquina)."""
+    problemas = [f"{nome}: está na linha de base mas não produziu resultado"
+                 for nome in base if nome not in atual and nome not in excluidos]
+    for nome, m in atual.items():
+        b = base.get(nome)
+        if not b:
+            continue
+        for chave in ("precision", "recall"):
+            if m[chave] < b[chave] - tol_acc:
+                problemas.append(f"{nome}: {chave} {b[chave]:.3f} -> {m[chave]:.3f}")
+        # ignora variações de fração de ms (ruído do relógio em detectores muito rápidos)
+        if m["p95_ms"] > b["p95_ms"] * (1 + tol_lat) and m["p95_ms"] - b["p95_ms"] > 0.5:
+            problemas.append(f"{nome}: p95 {b['p95_ms']:.2f} ms -> {m['p95_ms']:.2f} ms")
+    return problemas
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark offline dos detectores do bot.")
+    parser.add_argument("--only", nargs="*", choices=list(CASOS), help="roda só estes detectores")
+    parser.add_argument("--synthetic", type=int, default=40, help="frames sintéticos por detector")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--ui-scale", type=float, default=1.0, choices=SCALES,
+                        help="escala dos assets colados nos frames sintéticos da Jardinagem")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--write-baseline", "--update-baseline", dest="update_baseline", action="store_true",
+                        help="grava a linha de base em vez de comparar")
+    parser.add_argument("--lat-tol", type=float, default=0.25, help="piora máx. do p95 (fração)")
+    parser.add_argument("--acc-tol", type=float, default=0.02, help="queda máx. de precision/recall")
+    args = parser.parse_args()
+
+    store = TemplateStore(ASSETS_DIR, SCALES, log=_silencioso)
+    selecionados = args.only or list(CASOS)
+    resultados, ignorados, falhas = {}, set(), []
+    for nome in selecionados:
+        rng = np.random.default_rng(args.seed)
+        try:
+            detectar, amostras = CASOS[nome](store, rng, args)
+            resultados[nome] = m = medir(detectar, amostras)
+        except Indisponivel as e:
+            print(f"[⚠️] {nome}: ignorado ({e})")
+            ignorados.add(nome)
+            continue
+        except Exception as e:
+            print(f"[❌] {nome}: falhou ({type(e).__name__}: {e})")
+            falhas.append(nome)
+            continue
+        print(f"[📊] {nome:<18} {m['frames']:>4} frames | p50 {m['p50_ms']:7.2f} ms | "
+              f"p95 {m['p95_ms']:7.2f} ms | p99 {m['p99_ms']:7.2f} ms | {m['fps']:7.1f} fps | "
+              f"P {m['precision']:.3f} R {m['recall']:.3f} (tp {m['tp']} fp {m['fp']} fn {m['fn']})")
+
+    if args.update_baseline:
+        if falhas:
+            print(f"[❌] Linha de base não gravada: {', '.join(falhas)} falharam.")
+            return 1
+        base = {}
+        if os.path.isfile(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                base = json.load(f)
+        base.update(resultados)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(base, f, indent=2)
+        print(f"[💾] Linha de base gravada em {args.baseline}.")
+        return 0
+
+    if not os.path.isfile(args.baseline):
+        # sem linha de base não há o que comparar: o gate falha em vez de passar em branco
+        print(f"[❌] Sem linha de base ({args.baseline}); rode com --write-baseline para criar.")
+        return 1
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    # com --only, o resto da linha de base fica de fora de propósito
+    excluidos = frozenset((set(base) - set(selecionados) if args.only else set()) | ignorados)
+    problemas = comparar(resultados, base, args.lat_tol, args.acc_tol, excluidos)
+    for p in problemas:
+        print(f"[❌] Regressão: {p}")
+    if not problemas and not falhas:
+        print("[✓] Sem regressões em relação à linha de base.")
+    return 1 if problemas or falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
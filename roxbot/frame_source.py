@@ -0,0 +1,242 @@
+from __future__ import annotations
+import glob
+import os
+import threading
+import time
+from typing import Optional, Union
+
+import cv2
+import numpy as np
+
+IMAGE_PATTERNS = ("*.png", "*.jpg", "*.jpeg", "*.bmp")
+
+
+class FrameSource:
+    """
+    Interface das fontes de frame usadas pelos bots (mesma API do ScreenCapture):
+    `monitor()` devolve o retângulo da "tela" e `grab(region)` recorta uma ROI em BGR.
+    Fontes que não são a tela só precisam implementar `frame()` (a tela inteira atual);
+    o recorte, com borda preta fora da imagem como numa captura fora do monitor, vem daqui.
+    """
+
+    def frame(self) -> np.ndarray:
+        raise NotImplementedError
+
+    def size(self) -> tuple[int, int]:
+        h, w = self.frame().shape[:2]
+        return w, h
+
+    def monitor(self, index: Optional[int] = None) -> dict:
+        w, h = self.size()
+        return {"left": 0, "top": 0, "width": w, "height": h}
+
+    def grab(self, region: Optional[tuple[int, int, int, int]] = None) -> np.ndarray:
+        img = self.frame()
+        if region is None:
+            return img.copy()
+        left, top, w, h = (int(v) for v in region)
+        out = np.zeros((max(h, 0), max(w, 0), 3), np.uint8)
+        img_h, img_w = img.shape[:2]
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(left + w, img_w), min(top + h, img_h)
+        if x1 > x0 and y1 > y0:
+            out[y0 - top:y1 - top, x0 - left:x1 - left] = img[y0:y1, x0:x1]
+        return out
+
+    def grab_bbox(self, bbox: tuple[int, int, int, int]) -> np.ndarray:
+        x1, y1, x2, y2 = bbox
+        return self.grab((x1, y1, x2 - x1, y2 - y1))
+
+    def release_thread(self) -> None:
+        """Libera o que a fonte mantém para a thread atual (ex.: handle do mss). Cada loop
+        de bot chama ao sair; a fonte continua utilizável pelas outras threads."""
+
+    def close(self) -> None:
+        pass
+
+
+class ReplaySource(FrameSource):
+    """
+    Reproduz uma pasta de imagens (ordem alfabética) ou um arquivo de vídeo.
+    Com `fps`, o frame atual segue o relógio (como a tela real); sem `fps`, cada captura
+    avança um frame (o bot roda o mais rápido que conseguir — bom p/ teste de carga).
+    Sem `loop`, o último frame fica na tela e `finished` vira True.
+    """
+
+    def __init__(self, path: str, fps: Optional[float] = None, loop: bool = True, preload: bool = False):
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.finished = False
+        self._files: list[str] = []
+        self._video = None
+        self._video_pos = 0
+        self._cache: dict[int, np.ndarray] = {}
+        if os.path.isdir(path):
+            self._files = sorted(f for pat in IMAGE_PATTERNS for f in glob.glob(os.path.join(path, pat)))
+            if not self._files:
+                raise FileNotFoundError(f"Nenhuma imagem em {path}")
+            if preload:  # tira a leitura do disco da medição
+                self._cache = {i: cv2.imread(f) for i, f in enumerate(self._files)}
+        else:
+            self._video = cv2.VideoCapture(path)
+            if not self._video.isOpened():
+                raise FileNotFoundError(f"Não foi possível abrir {path}")
+        self._lock = threading.Lock()
+        self.rewind()
+
+    def rewind(self) -> None:
+        self._t0: Optional[float] = None
+        self._idx = -1
+        self._img: Optional[np.ndarray] = None
+        self._served = True
+        self.finished = False
+
+    def _load(self, idx: int) -> Optional[np.ndarray]:
+        if self._video is None:
+            n = len(self._files)
+            if idx >= n and not self.loop:
+                return None
+            idx %= n
+            img = self._cache.get(idx)
+            return img if img is not None else cv2.imread(self._files[idx])
+        total = int(self._video.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if total > 0:
+            if idx >= total and not self.loop:
+                return None
+            idx %= total
+        if idx < self._video_pos:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self._video_pos = 0
+        while self._video_pos < idx:  # pula os frames que o relógio já passou
+            if not self._video.grab():
+                return None
+            self._video_pos += 1
+        ok, img = self._video.read()
+        if not ok:
+            return None
+        self._video_pos += 1
+        return img
+
+    def _target(self) -> int:
+        if self.fps:
+            agora = time.perf_counter()
+            if self._t0 is None:
+                self._t0 = agora
+            return int((agora - self._t0) * self.fps)
+        return self._idx + (1 if self._served else 0)
+
+    def frame(self) -> np.ndarray:
+        with self._lock:
+            idx = self._target()
+            if idx != self._idx or self._img is None:
+                img = self._load(max(idx, 0))
+                if img is None:
+                    self.finished = True
+                    if self._img is None:
+                        raise EOFError(f"{self.path} não tem frames")
+                else:
+                    self._img, self._idx = img, idx
+            self._served = True
+            return self._img
+
+    def size(self) -> tuple[int, int]:
+        with self._lock:
+            if self._img is None:  # carrega o primeiro frame sem "consumi-lo"
+                self._img, self._idx, self._served = self._load(0), 0, False
+        return super().size() if self._img is None else (self._img.shape[1], self._img.shape[0])
+
+    def close(self) -> None:
+        if self._video is not None:
+            self._video.release()
+
+
+class SyntheticSource(FrameSource):
+    """
+    Tela sintética: um fundo com assets colados por cima (camadas com nome).
+    Cada camada pode ter início e duração (segundos desde `rewind()`), o que permite montar
+    cenários como "o modal aparece em 1 s e some 2 s depois". Templates com canal alfa
+    (BGRA) são mesclados; `noise` soma ruído gaussiano para imitar a variação da captura.
+    """
+
+    def __init__(self, background: Union[np.ndarray, tuple[int, int]], noise: float = 0.0, seed: int = 0):
+        if isinstance(background, tuple):
+            w, h = background
+            background = np.full((h, w, 3), 40, np.uint8)
+        self.background = background
+        self.noise = noise
+        self._rng = np.random.default_rng(seed)
+        self._layers: dict[str, tuple[np.ndarray, tuple[int, int], float, Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self._composed: Optional[tuple[tuple, np.ndarray]] = None
+        self.rewind()
+
+    def rewind(self) -> None:
+        self._t0 = time.perf_counter()
+
+    def show(self, name: str, image: np.ndarray, pos: tuple[int, int],
+             start: float = 0.0, duration: Optional[float] = None) -> None:
+        """Cola `image` com o canto superior esquerdo em `pos`, de `start` até `start + duration`."""
+        with self._lock:
+            self._layers[name] = (image, (int(pos[0]), int(pos[1])), start, duration)
+            self._composed = None
+
+    def hide(self, name: str) -> None:
+        with self._lock:
+            self._layers.pop(name, None)
+            self._composed = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._layers.clear()
+            self._composed = None
+
+    @staticmethod
+    def _paste(dst: np.ndarray, img: np.ndarray, pos: tuple[int, int]) -> None:
+        x, y = pos
+        h, w = img.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, dst.shape[1]), min(y + h, dst.shape[0])
+        if x1 <= x0 or y1 <= y0:
+            return
+        src = img[y0 - y:y1 - y, x0 - x:x1 - x]
+        if src.ndim == 2:
+            src = cv2.cvtColor(src, cv2.COLOR_GRAY2BGR)
+        if src.shape[2] == 4:
+            alpha = src[:, :, 3:].astype(np.float32) / 255.0
+            region = dst[y0:y1, x0:x1].astype(np.float32)
+            dst[y0:y1, x0:x1] = (src[:, :, :3] * alpha + region * (1 - alpha)).astype(np.uint8)
+        else:
+            dst[y0:y1, x0:x1] = src
+
+    def frame(self) -> np.ndarray:
+        t = time.perf_counter() - self._t0
+        with self._lock:
+            visiveis = tuple(name for name, (_, _, start, dur) in self._layers.items()
+                             if t >= start and (dur is None or t < start + dur))
+            if self._composed is None or self._composed[0] != visiveis:
+                img = self.background.copy()
+                for name in visiveis:
+                    layer, pos, _, _ = self._layers[name]
+                    self._paste(img, layer, pos)
+                self._composed = (visiveis, img)
+            img = self._composed[1]
+        if self.noise > 0:
+            ruido = self._rng.normal(0, self.noise, img.shape)
+            img = np.clip(img + ruido, 0, 255).astype(np.uint8)
+        return img
+
+
+def open_source(spec: Optional[str] = None, fps: Optional[float] = None) -> FrameSource:
+    """
+    Fonte a partir de um texto de configuração: vazio/"screen" = tela ao vivo (mss);
+    caminho de pasta ou vídeo = replay, com FPS opcional no formato "caminho@fps".
+    """
+    if not spec or spec == "screen":
+        from screen_capture import get_capture
+        return get_capture()
+    if "@" in spec:
+        path, _, rate = spec.rpartition("@")
+        if path and rate.replace(".", "", 1).isdigit():
+            spec, fps = path, float(rate)
+    return ReplaySource(spec, fps=fps)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+import os
+from typing import Callable
+
+import cv2
+import numpy as np
+
+# nome do arquivo <-> caractere (operadores não podem virar nome de arquivo)
+GLYPH_NAMES = {"mais": "+", "menos": "-", "vezes": "*", "div": "/",
+               **{str(d): str(d) for d in range(10)}}
+GLYPH_FILES = {v: k for k, v in GLYPH_NAMES.items()}
+GLYPH_SIZE = 20
+
+
+class GlyphReader:
+    """
+    Leitor rápido da expressão do modal da Jardinagem (ex.: '12+7'), sem OCR.
+    A fonte do modal é fixa: cada caractere tem preenchimento claro sobre fundo cinza e
+    contorno escuro. A faixa da expressão é binarizada pelo preenchimento, segmentada por
+    componentes conexos e cada glifo é comparado de uma vez (produto matricial) com os
+    templates em `glyph_dir`. Os templates são aprendidos a partir das leituras do PaddleOCR
+    cuja resposta o jogo aceitou (ver `learn`) ou colocados à mão como `<nome>_<n>.png`
+    (nomes em GLYPH_NAMES); `forget` descarta os de um caractere que se mostrou errado.
+    """
+
+    def __init__(self, glyph_dir: str, *,
+                 band: tuple[float, float, float, float] = (0.22, 0.33, 0.78, 0.455),
+                 fill_delta: int = 6,
+                 min_conf: float = 0.9,
+                 max_samples: int = 3,
+                 log: Callable[[str], None] = print):
+        self.glyph_dir = glyph_dir
+        self.band = band  # (x0, y0, x1, y1) da expressão, em fração do modal
+        self.fill_delta = fill_delta
+        self.min_conf = min_conf
+        self.max_samples = max_samples
+        self.log = log
+        self._chars: list[str] = []
+        self._matrix = np.zeros((0, GLYPH_SIZE * GLYPH_SIZE), np.float32)
+        self.reload()
+
+    # ---------- templates ----------
+    @staticmethod
+    def _vector(mask: np.ndarray) -> np.ndarray:
+        """Glifo centralizado num quadrado (mantém a proporção), reduzido e normalizado."""
+        h, w = mask.shape[:2]
+        side = max(h, w)
+        canvas = np.zeros((side, side), np.uint8)
+        y0, x0 = (side - h) // 2, (side - w) // 2
+        canvas[y0:y0 + h, x0:x0 + w] = mask
+        small = cv2.resize(canvas, (GLYPH_SIZE, GLYPH_SIZE), interpolation=cv2.INTER_AREA)
+        vec = small.astype(np.float32).ravel()
+        vec -= vec.mean()
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else vec
+
+    def reload(self) -> None:
+        chars, vectors = [], []
+        if os.path.isdir(self.glyph_dir):
+            for fname in sorted(os.listdir(self.glyph_dir)):
+                stem, ext = os.path.splitext(fname)
+                char = GLYPH_NAMES.get(stem.split("_")[0])
+                if ext.lower() != ".png" or char is None:
+                    continue
+                img = cv2.imread(os.path.join(self.glyph_dir, fname), cv2.IMREAD_GRAYSCALE)
+                if img is None:
+                    continue
+                chars.append(char)
+                vectors.append(self._vector(img))
+        self._chars = chars
+        self._matrix = np.stack(vectors) if vectors else np.zeros((0, GLYPH_SIZE * GLYPH_SIZE), np.float32)
+
+    def _count(self, char: str) -> int:
+        return self._chars.count(char)
+
+    @property
+    def ready(self) -> bool:
+        """Só confia no leitor quando já conhece os 10 dígitos (senão confundiria um dígito novo)."""
+        return all(str(d) in self._chars for d in range(10))
+
+    # ---------- segmentação ----------
+    def _segment(self, modal_gray: np.ndarray) -> list[np.ndarray]:
+        """Máscaras dos glifos da faixa da expressão, da esquerda para a direita."""
+        h, w = modal_gray.shape[:2]
+        x0, y0, x1, y1 = self.band
+        band = modal_gray[int(y0 * h):int(y1 * h), int(x0 * w):int(x1 * w)]
+        if band.size == 0:
+            return []
+        level = float(np.median(band)) + self.fill_delta
+        mask = (band > level).astype(np.uint8) * 255
+        n, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if n <= 1:
+            return []
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        keep = [i + 1 for i, a in enumerate(areas) if a >= 0.15 * areas.max()]
+
+        # junta componentes que se sobrepõem na horizontal (ex.: os pontos do '÷')
+        boxes = sorted(([stats[i, 0], stats[i, 0] + stats[i, 2], [i]] for i in keep), key=lambda b: b[0])
+        merged: list[list] = []
+        for box in boxes:
+            if merged and box[0] < merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], box[1])
+                merged[-1][2].extend(box[2])
+            else:
+                merged.append(box)
+
+        glyphs = []
+        for _, _, ids in merged:
+            comp = np.isin(labels, ids).astype(np.uint8) * 255
+            ys, xs = np.nonzero(comp)
+            glyphs.append(comp[ys.min():ys.max() + 1, xs.min():xs.max() + 1])
+        return glyphs
+
+    # ---------- leitura / aprendizado ----------
+    def read(self, modal_gray: np.ndarray) -> tuple[str, float]:
+        """(texto, confiança) — confiança = pior score entre os glifos; ('', 0) se não leu."""
+        if not self.ready:
+            return "", 0.0
+        glyphs = self._segment(modal_gray)
+        if not glyphs:
+            return "", 0.0
+        samples = np.stack([self._vector(g) for g in glyphs])
+        scores = samples @ self._matrix.T
+        best = scores.argmax(axis=1)
+        text = "".join(self._chars[i] for i in best)
+        conf = float(scores[np.arange(len(glyphs)), best].min())
+        return text, conf
+
+    def learn(self, modal_gray: np.ndarray, text: str) -> int:
+        """Guarda os glifos de `text` — chame só depois que o jogo aceitou a resposta calculada
+        a partir dele (um glifo salvo errado nunca é substituído); retorna quantos salvou."""
+        glyphs = self._segment(modal_gray)
+        if len(glyphs) != len(text):
+            return 0
+        os.makedirs(self.glyph_dir, exist_ok=True)
+        saved = 0
+        for char, glyph in zip(text, glyphs):
+            name = GLYPH_FILES.get(char)
+            count = self._count(char)
+            if name is None or count >= self.max_samples:
+                continue
+            cv2.imwrite(os.path.join(self.glyph_dir, f"{name}_{count}.png"), glyph)
+            self._chars.append(char)
+            self._matrix = np.vstack([self._matrix, self._vector(glyph)[None, :]])
+            saved += 1
+        if saved:
+            self.log(f"[🔤] {saved} glifo(s) aprendidos de '{text}'.")
+        return saved
+
+    def forget(self, chars: str) -> int:
+        """Apaga do disco e da memória todos os templates dos caracteres em `chars`
+        (ex.: o leitor disse '1' onde o OCR, confirmado, leu '7'); retorna quantos apagou."""
+        names = {GLYPH_FILES[c] for c in chars if c in GLYPH_FILES}
+        removed = 0
+        if os.path.isdir(self.glyph_dir):
+            for fname in os.listdir(self.glyph_dir):
+                stem, ext = os.path.splitext(fname)
+                if ext.lower() == ".png" and stem.split("_")[0] in names:
+                    os.remove(os.path.join(self.glyph_dir, fname))
+                    removed += 1
+        if removed:
+            self.reload()
+            self.log(f"[🔤] {removed} glifo(s) de '{''.join(sorted(set(chars)))}' descartados (divergiam do OCR).")
+        return removed
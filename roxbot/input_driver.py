@@ -0,0 +1,136 @@
+from __future__ import annotations
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+
+class InputDriver:
+    """
+    Interface de cliques dos bots. Cada backend implementa só `_click(x, y)` — mover e clicar
+    numa única chamada, sem pausas; a medição de latência por clique e as sequências
+    (ex.: teclado virtual) ficam aqui. Um lock impede que cliques de threads diferentes
+    se intercalem no meio de uma sequência.
+    """
+
+    def __init__(self, history: int = 256):
+        self.latencies_ms: deque[float] = deque(maxlen=history)
+        self.clicks = 0
+        self._lock = threading.Lock()
+
+    def _click(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def _timed_click(self, x: int, y: int) -> float:
+        t0 = time.perf_counter()
+        self._click(int(x), int(y))
+        ms = (time.perf_counter() - t0) * 1000
+        self.latencies_ms.append(ms)
+        self.clicks += 1
+        return ms
+
+    def click(self, x: int, y: int) -> float:
+        """Move e clica em (x, y); devolve quanto o clique levou (ms)."""
+        with self._lock:
+            return self._timed_click(x, y)
+
+    def click_sequence(self, positions: Iterable[tuple[int, int]], interval: float = 0.0) -> float:
+        """Clica as posições em ordem, sem outro clique no meio; devolve o total (ms)."""
+        t0 = time.perf_counter()
+        with self._lock:
+            for i, (x, y) in enumerate(positions):
+                if i and interval > 0:
+                    time.sleep(interval)
+                self._timed_click(x, y)
+        return (time.perf_counter() - t0) * 1000
+
+    def stats(self) -> str:
+        if not self.latencies_ms:
+            return "nenhum clique"
+        p50, p95 = np.percentile(list(self.latencies_ms), [50, 95])
+        return f"{self.clicks} cliques | p50 {p50:.2f} ms | p95 {p95:.2f} ms"
+
+
+class PyAutoGuiDriver(InputDriver):
+    """
+    pyautogui, mas sem o PAUSE (0,1 s após cada chamada) e com mover + clicar numa chamada só
+    (o moveTo + click antigo pagava a pausa duas vezes).
+    """
+
+    def __init__(self, failsafe: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        import pyautogui
+        pyautogui.FAILSAFE = failsafe
+        self._gui = pyautogui
+
+    def _click(self, x: int, y: int) -> None:
+        self._gui.click(x, y, _pause=False)
+
+
+class Win32Driver(InputDriver):
+    """SetCursorPos + mouse_event direto na user32 (Windows): poucos µs por clique."""
+
+    MOUSEEVENTF_LEFTDOWN = 0x0002
+    MOUSEEVENTF_LEFTUP = 0x0004
+
+    def __init__(self, hold: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        import ctypes
+        self._user32 = ctypes.windll.user32
+        try:
+            # mesmas coordenadas físicas da captura (mss/pyautogui também ativam isso)
+            self._user32.SetProcessDPIAware()
+        except Exception:
+            pass
+        self.hold = hold  # alguns jogos ignoram clique com 0 ms entre apertar e soltar
+
+    def _click(self, x: int, y: int) -> None:
+        self._user32.SetCursorPos(x, y)
+        self._user32.mouse_event(self.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
+        if self.hold > 0:
+            time.sleep(self.hold)
+        self._user32.mouse_event(self.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
+
+
+class RecordingDriver(InputDriver):
+    """
+    Não mexe no mouse: só registra (instante, x, y) em `events`. Para testes, replays e
+    benchmarks; `on_click` permite simular a reação da tela (ex.: esconder uma camada
+    da SyntheticSource quando o botão é clicado).
+    """
+
+    def __init__(self, on_click: Optional[Callable[[int, int], None]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.on_click = on_click
+        self.events: list[tuple[float, int, int]] = []
+
+    def _click(self, x: int, y: int) -> None:
+        self.events.append((time.perf_counter(), x, y))
+        if self.on_click:
+            self.on_click(x, y)
+
+
+def default_driver() -> InputDriver:
+    """Backend mais rápido disponível: user32 no Windows, pyautogui sem pausa nos demais."""
+    if sys.platform == "win32":
+        try:
+            return Win32Driver()
+        except (OSError, AttributeError):
+            pass
+    return PyAutoGuiDriver()
+
+
+_default: Optional[InputDriver] = None
+_default_lock = threading.Lock()
+
+
+def get_driver() -> InputDriver:
+    """Instância única compartilhada pelos bots, criada sob demanda."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = default_driver()
+        return _default
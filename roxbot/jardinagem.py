@@ -4,7 +4,26 @@ import re
 import time
 import cv2
 import numpy as np
-import pyautogui
+
+from frame_change import ChangeDetector
+from frame_source import FrameSource
+from glyph_reader import GlyphReader
+from input_driver import InputDriver, get_driver
+from ocr_cache import OcrCache
+from matcher import PyramidMatcher
+from screen_capture import get_capture
+from telemetry import Telemetry, get_telemetry
+from template_store import ScaleCalibrator, TemplateStore
+
+# Layout do teclado virtual (keyboard_virtual.png): centro de cada tecla em fração da imagem
+KEYPAD_LAYOUT = (
+    ("1", "2", "3", "apagar"),
+    ("4", "5", "6", "0"),
+    ("7", "8", "9", "confirm"),
+)
+KEYPAD_COLS = (0.162, 0.386, 0.612, 0.838)
+KEYPAD_ROWS = (0.203, 0.496, 0.790)
+KEYPAD_STILL_THRESHOLD = 0.8  # semelhança mínima p/ considerar que o teclado não se moveu
 
 class JardinagemBot:
     def __init__(self, *,
@@ -13,60 +32,198 @@ class JardinagemBot:
                  assets_dir: str,
                  routine_folder: str = "jardinagem",
                  scan_interval: float = 0.05,
-                 scales: list[float] | tuple[float, ...] = (0.8, 0.9, 1.0, 1.1, 1.2)):
+                 scales: list[float] | tuple[float, ...] = (0.8, 0.9, 1.0, 1.1, 1.2),
+                 capture: FrameSource | None = None,
+                 templates: TemplateStore | None = None,
+                 reuse_frame: bool = True,
+                 glyph_reader: GlyphReader | None = None,
+                 ocr_cache: OcrCache | None = None,
+                 ocr_wait: float = 5.0,
+                 confirm_wait: float = 1.0,
+                 input_driver: InputDriver | None = None,
+                 key_interval: float = 0.0,
+                 telemetry: Telemetry | None = None):
         self.log = log
         self.ocr_engine = ocr_engine
         self.assets_dir = assets_dir
         self.routine_folder = routine_folder
         self.scan_interval = scan_interval
         self.scales = [s for s in scales if s > 0]
+        self.capture = capture or get_capture()
+        self.templates = templates or TemplateStore(assets_dir, self.scales, log=log)
+        self.calibrador = ScaleCalibrator(log=log)
+        self.input = input_driver or get_driver()
+        self.key_interval = key_interval  # pausa entre teclas do teclado virtual (0 = sem pausa)
+        self.telemetry = telemetry or get_telemetry(routine_folder)
+        # modo "frame de contexto": um frame serve todas as buscas até um clique mudar a tela
+        self.reuse_frame = reuse_frame
+        self._frame_cache: np.ndarray | None = None
+        self._frame_thumb: np.ndarray | None = None
+        self._capturas = 0
+        self.detector = ChangeDetector()
+        self.matcher = PyramidMatcher(color=True)
+        # leitor rápido da expressão; o PaddleOCR fica como fallback (e ensina os glifos)
+        self.glifos = glyph_reader or GlyphReader(os.path.join(assets_dir, routine_folder, "glifos"), log=log)
+        self.ocr_cache = ocr_cache or OcrCache(log=log)
+        self.ocr_wait = ocr_wait  # espera máx. pelo OCR carregado em segundo plano (LazyOcr)
+        self.confirm_wait = confirm_wait  # espera máx. pelo modal fechar após o OK (resposta aceita)
+        # leitura do modal atual, conferida depois do OK:
+        # (origem, cinza, expressão, leitura dos glifos, chave no cache de OCR)
+        self._leitura: tuple[str, np.ndarray, str, str, str | None] | None = None
+        self._evitar_glifos = False  # leitura dos glifos recusada: o próximo modal vai direto ao OCR
+        self._teclado: dict | None = None  # geometria do teclado virtual em cache
 
     # --------------- util ---------------
-    def _clicar(self, posicao: tuple[int, int]):
-        self.log(f"[→] Clicando em {posicao}")
-        pyautogui.moveTo(posicao[0], posicao[1], duration=0)
-        pyautogui.click()
+    def _clicar(self, posicao: tuple[int, int], muda_tela: bool = True):
+        ms = self.input.click(*posicao)
+        self.telemetry.observe("click", ms)
+        self.log(f"[→] Clicado em {posicao} ({ms:.1f} ms)")
+        if muda_tela:
+            self._invalidar_frame()
+
+    def _frame(self) -> np.ndarray:
+        """Frame compartilhado da iteração; só recaptura se um clique o invalidou."""
+        if self._frame_cache is None or not self.reuse_frame:
+            with self.telemetry.stage("capture"):
+                self._frame_cache = self.capture.grab()
+            self._frame_thumb = None
+            self._capturas += 1
+        return self._frame_cache
+
+    def _miniatura(self) -> np.ndarray:
+        """Miniatura do frame atual para o detector de mudança (uma por captura)."""
+        frame = self._frame()
+        if self._frame_thumb is None:
+            self._frame_thumb = self.detector.thumbnail(frame)
+        return self._frame_thumb
+
+    def _invalidar_frame(self) -> None:
+        self._frame_cache = None
+        self._frame_thumb = None
 
     def _encontrar_imagem(self, imagem_base: str, thresholds=(0.8, 0.7, 0.67)):
-        screenshot = pyautogui.screenshot()
-        screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-
-        base_path = os.path.join(self.assets_dir, self.routine_folder, imagem_base)
-        candidates = [base_path]
-        name, ext = os.path.splitext(imagem_base)
-        for s in self.scales:
-            if abs(s - 1.0) < 1e-6:
-                continue
-            candidates.append(os.path.join(self.assets_dir, self.routine_folder,
-                                           f"{name}_scale{int(s*100)}{ext}"))
-
-        for asset_path in candidates:
-            template = cv2.imread(asset_path, cv2.IMREAD_COLOR)
-            if template is None:
-                continue
-            h, w = template.shape[:2]
-            result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, max_loc = cv2.minMaxLoc(result)
-            for thresh in thresholds:
-                if max_val >= thresh:
-                    x, y = max_loc[0] + w // 2, max_loc[1] + h // 2
-                    self.log(f"[✓] Encontrado '{os.path.basename(asset_path)}' conf {max_val:.2f}")
-                    return (x, y), (max_loc, (w, h))
-        return None, None
+        # tela igual à da última busca deste asset? reaproveita o resultado sem matching
+        screenshot = self._frame()
+        return self.detector.cached((imagem_base, thresholds), screenshot,
+                                    lambda: self._buscar_imagem(screenshot, imagem_base, thresholds),
+                                    thumb=self._miniatura())
+
+    def _buscar_imagem(self, screenshot: np.ndarray, imagem_base: str, thresholds):
+        pyramid = self.templates.pyramid(self.routine_folder, imagem_base)
+        # fica com a MELHOR escala (não a primeira que passa no limiar)
+        best = None
+        with self.telemetry.stage("match"):
+            for scale, template in self.calibrador.filter(pyramid):
+                h, w = template.shape[:2]
+                if h > screenshot.shape[0] or w > screenshot.shape[1]:
+                    continue
+                max_val, max_loc = self.matcher.match(screenshot, template)
+                if max_loc is None:
+                    continue
+                if best is None or max_val > best[0]:
+                    best = (max_val, scale, max_loc, w, h)
+
+        if best is None or best[0] < min(thresholds):
+            self.calibrador.miss()
+            return None, None
+        max_val, scale, max_loc, w, h = best
+        self.calibrador.hit(scale, max_val)
+        x, y = max_loc[0] + w // 2, max_loc[1] + h // 2
+        self.log(f"[✓] Encontrado '{imagem_base}' (escala {scale:.1f}) conf {max_val:.2f}")
+        return (x, y), (max_loc, (w, h))
 
     # --------------- OCR/expressão ---------------
     def _extrair_expressao(self, coord_top_left, size):
-        screenshot = pyautogui.screenshot()
-        screenshot_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+        screenshot_cv = self._frame()
         x, y = coord_top_left
         w, h = size
         roi = screenshot_cv[y:y+h, x:x+w]
-        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-        eq = cv2.equalizeHist(gray)
-        result = self.ocr_engine.ocr(eq, cls=False)
+        with self.telemetry.stage("cvt"):
+            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+
+        with self.telemetry.stage("glifos"):
+            lido_glifos, conf = self.glifos.read(gray)
+        if conf < self.glifos.min_conf:
+            lido_glifos = ""
+        if lido_glifos and not self._evitar_glifos:
+            expressao = self._filtrar_expressao(lido_glifos)
+            if expressao == lido_glifos:
+                self.log(f"[Glifos] Expressão lida: '{lido_glifos}' conf {conf:.2f}")
+                self._leitura = ("glifos", gray, expressao, lido_glifos, None)
+                return expressao
+        self._evitar_glifos = False
+
+        with self.telemetry.stage("cvt"):
+            eq = cv2.equalizeHist(gray)
+        # mesmo modal já lido antes (nesta sessão ou em outra)? pula a inferência
+        chave = self.ocr_cache.key(eq, self.glifos.band)
+        texto = self.ocr_cache.get(chave)
+        if texto is not None:
+            self.telemetry.incr("ocr_cache")
+            self.log(f"[OCR cache] Texto em cache: '{texto}' ({self.ocr_cache.stats()})")
+            expressao = self._filtrar_expressao(texto)
+            if expressao:  # recusada, sai do cache (_conferir_leitura)
+                self._leitura = ("cache", gray, expressao, lido_glifos, chave)
+            return expressao
+
+        if not self._ocr_disponivel():
+            return None
+        with self.telemetry.stage("ocr"):
+            result = self.ocr_engine.ocr(eq, cls=False)
         texto = " ".join([line[1][0] for line in result[0]]) if result and result[0] else ""
         self.log(f"[PaddleOCR] Texto detectado: '{texto}'")
-        return self._filtrar_expressao(texto)
+        expressao = self._filtrar_expressao(texto)
+        if texto:  # leitura vazia/expirada não vai p/ o cache (o próximo modal tenta de novo)
+            self.ocr_cache.put(chave, texto)  # só em memória até o jogo aceitar a resposta
+        if expressao:  # disco e glifos só se o jogo aceitar a resposta (_conferir_leitura)
+            self._leitura = ("ocr", gray, expressao, lido_glifos, chave)
+        return expressao
+
+    def _modal_fechou(self) -> bool:
+        """Espera até `confirm_wait` s o modal sumir depois do OK (= resposta aceita)."""
+        limite = time.perf_counter() + self.confirm_wait
+        while True:
+            self._invalidar_frame()
+            modal, _ = self._encontrar_imagem("modal.png")
+            if not modal:
+                return True
+            if time.perf_counter() >= limite:
+                return False
+            time.sleep(self.scan_interval)
+
+    def _conferir_leitura(self) -> None:
+        """
+        Depois do OK, confere se a resposta foi aceita antes de tocar nos glifos e no cache:
+        texto do OCR (novo ou do cache) aceito vai para o disco e ensina os glifos (descartando
+        os que tinham lido outra coisa); recusado, sai do cache. Leitura dos glifos recusada
+        faz o próximo modal passar pelo OCR para tirar a dúvida.
+        """
+        leitura, self._leitura = self._leitura, None
+        if leitura is None:
+            return
+        origem, gray, expressao, lido_glifos, chave = leitura
+        if not self._modal_fechou():
+            self.telemetry.incr("recusados")
+            self.log(f"[!] Resposta de '{expressao}' não foi aceita (modal continua aberto).")
+            if origem == "glifos":
+                self._evitar_glifos = True
+            elif chave is not None:
+                self.ocr_cache.forget(chave)
+            return
+        if origem == "glifos":
+            return
+        self.ocr_cache.promote(chave)
+        if lido_glifos and lido_glifos != expressao and len(lido_glifos) == len(expressao):
+            self.glifos.forget("".join(g for g, o in zip(lido_glifos, expressao) if g != o))
+        self.glifos.learn(gray, expressao)
+
+    def _ocr_disponivel(self) -> bool:
+        """O motor de OCR já carregou? Motores sem `wait` (PaddleOCR direto) estão sempre prontos."""
+        wait = getattr(self.ocr_engine, "wait", None)
+        if wait is None or wait(self.ocr_wait):
+            return True
+        self.log("[⏳] OCR ainda carregando; tentando de novo no próximo modal.")
+        return False
 
     @staticmethod
     def _filtrar_expressao(texto: str) -> str | None:
@@ -83,49 +240,113 @@ class JardinagemBot:
         except Exception:
             return None
 
+    # --------------- teclado virtual ---------------
+    def _teclas_teclado(self) -> dict[str, tuple[int, int]] | None:
+        """
+        Localiza o teclado inteiro uma vez e deriva a posição de cada tecla pelo layout.
+        A geometria fica em cache enquanto o recorte do teclado na tela continuar igual.
+        """
+        frame = self._frame()
+        if self._teclado is not None:
+            x, y, w, h = self._teclado["bbox"]
+            atual = frame[y:y+h, x:x+w]
+            if atual.shape == self._teclado["patch"].shape:
+                res = cv2.matchTemplate(atual, self._teclado["patch"], cv2.TM_CCOEFF_NORMED)
+                if float(res[0, 0]) >= KEYPAD_STILL_THRESHOLD:
+                    return self._teclado["teclas"]
+            self.log("[↻] Teclado virtual mudou de lugar; recalculando teclas.")
+            self._teclado = None
+
+        _, meta = self._encontrar_imagem("keyboard_virtual.png")
+        if not meta:
+            return None
+        (x, y), (w, h) = meta
+        teclas = {
+            tecla: (x + int(fx * w), y + int(fy * h))
+            for linha, fy in zip(KEYPAD_LAYOUT, KEYPAD_ROWS)
+            for tecla, fx in zip(linha, KEYPAD_COLS)
+        }
+        self._teclado = {"bbox": (x, y, w, h), "patch": frame[y:y+h, x:x+w].copy(), "teclas": teclas}
+        return teclas
+
+    def _posicao_tecla(self, teclas: dict[str, tuple[int, int]] | None, tecla: str):
+        if teclas is not None:
+            return teclas.get(tecla)
+        # sem teclado localizado: busca a tecla individualmente (modo antigo)
+        pos, _ = self._encontrar_imagem(f"key_{tecla}.png")
+        return pos
+
     def _preencher_via_teclado_virtual(self, valor: str) -> bool:
         pos_input, _ = self._encontrar_imagem("input_box.png")
         if not pos_input:
             self.log("[!] Campo de input não encontrado.")
             return False
         self._clicar(pos_input)
+        teclas = self._teclas_teclado()
+        if teclas is None:
+            self.log("[!] Teclado virtual não localizado; buscando tecla a tecla.")
+        # apertar uma tecla não move o teclado: todas as posições saem do mesmo frame
+        sequencia = []
         for digito in valor:
-            pos_tecla, _ = self._encontrar_imagem(f"key_{digito}.png")
+            pos_tecla = self._posicao_tecla(teclas, digito)
             if pos_tecla:
-                self._clicar(pos_tecla)
+                sequencia.append(pos_tecla)
             else:
                 self.log(f"[!] Tecla '{digito}' não encontrada.")
-        pos_confirma, _ = self._encontrar_imagem("key_confirm.png")
-        if pos_confirma:
-            self._clicar(pos_confirma)
-            return True
-        self.log("[!] Botão confirmar não encontrado.")
-        return False
+        pos_confirma = self._posicao_tecla(teclas, "confirm")
+        if not pos_confirma:
+            self.log("[!] Botão confirmar não encontrado.")
+            return False
+        sequencia.append(pos_confirma)
+        ms = self.input.click_sequence(sequencia, self.key_interval)
+        self.telemetry.observe("teclado", ms)
+        self.log(f"[⌨️] '{valor}' + confirmar: {len(sequencia)} cliques em {ms:.1f} ms")
+        self._invalidar_frame()
+        return True
 
     # --------------- loop público ---------------
     def run(self, is_running):
-        while is_running():
-            espada_data, _ = self._encontrar_imagem("button.png")
-            if espada_data:
-                self._clicar(espada_data)
-
-            modal_data, meta = self._encontrar_imagem("modal.png")
-            if modal_data and meta:
-                top_left, size = meta
-                expressao = self._extrair_expressao(top_left, size)
-                if expressao:
-                    resultado = self._calcular_expressao(expressao)
-                    if resultado:
-                        if self._preencher_via_teclado_virtual(resultado):
-                            ok_data, _ = self._encontrar_imagem("ok_button.png")
-                            if ok_data:
-                                self._clicar(ok_data)
-                            else:
-                                self.log("[!] Botão OK não encontrado.")
-                else:
-                    self.log("[!] Nenhuma expressão válida encontrada no OCR.")
-
-            time.sleep(self.scan_interval)
+        start_ocr = getattr(self.ocr_engine, "start", None)
+        if start_ocr:
+            start_ocr()  # idempotente; já começou se a rotina foi escolhida no combobox
+        try:
+            while is_running():
+                inicio_tick = time.perf_counter()
+                self._invalidar_frame()
+                espada_data, _ = self._encontrar_imagem("button.png")
+                if espada_data:
+                    self._clicar(espada_data)
+
+                modal_data, meta = self._encontrar_imagem("modal.png")
+                if modal_data and meta:
+                    inicio, capturas_ini = time.perf_counter(), self._capturas
+                    top_left, size = meta
+                    self._leitura = None
+                    expressao = self._extrair_expressao(top_left, size)
+                    if expressao:
+                        resultado = self._calcular_expressao(expressao)
+                        if resultado:
+                            if self._preencher_via_teclado_virtual(resultado):
+                                ok_data, _ = self._encontrar_imagem("ok_button.png")
+                                if ok_data:
+                                    self._clicar(ok_data)
+                                else:
+                                    self.log("[!] Botão OK não encontrado.")
+                                self._conferir_leitura()
+                                resolvido_ms = (time.perf_counter() - inicio) * 1000
+                                self.telemetry.observe("modal", resolvido_ms)
+                                self.telemetry.incr("modais")
+                                self.log(f"[⏱] Modal resolvido em {resolvido_ms:.0f} ms "
+                                         f"({self._capturas - capturas_ini + 1} capturas)")
+                    else:
+                        self.telemetry.incr("sem_expressao")
+                        self.log("[!] Nenhuma expressão válida encontrada no OCR.")
+
+                self.telemetry.observe("tick", (time.perf_counter() - inicio_tick) * 1000)
+                with self.telemetry.stage("sleep"):
+                    time.sleep(self.scan_interval)
+        finally:
+            self.capture.release_thread()  # solta o handle de captura desta thread
         self.log("[⏹] Jardinagem parada.")
 
 
@@ -161,6 +382,7 @@ class JardinagemAssetWizard(_tk.Toplevel):
         ("modal.png", "Recorte JUSTO do quadro onde aparece a expressão."),
         ("input_box.png", "Recorte JUSTO da caixa de input numérico."),
         ("key_confirm.png", "Recorte JUSTO do botão CONFIRMAR do teclado virtual."),
+        ("keyboard_virtual.png", "Recorte JUSTO do teclado virtual inteiro (todas as teclas)."),
         ("keys_multi", "CAPTURA MÚLTIPLA: selecione as teclas numéricas na ordem desejada."),
         ("ok_button.png", "Recorte JUSTO do botão OK/final."),
     ]
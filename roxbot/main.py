@@ -1,16 +1,19 @@
+from __future__ import annotations
 import os
+import sys
 import threading
 import tkinter as tk
 from tkinter import messagebox, ttk
 
-import pyautogui
-import cv2
-from paddleocr import PaddleOCR
-
+from frame_source import open_source
 from jardinagem import JardinagemBot, open_asset_wizard_jardinagem
+from log_sink import INFO, LogSink
+from ocr_cache import OcrCache
+from ocr_engine import LazyOcr
+from ocr_worker import OcrClient
 from pesca import PescaBot, open_asset_wizard  # botão do assistente da Pesca
-
-pyautogui.FAILSAFE = False
+from telemetry import get_telemetry, start_exporter
+from template_store import TemplateStore
 
 ASSETS_DIR = "assets"
 ROUTINES = {"Jardinagem": "jardinagem", "Pesca": "pesca"}
@@ -23,54 +26,64 @@ ASSETS_JARDINAGEM = [
 ]
 ASSETS_PESCA = ["lancar.png", "carretel.png", "carretel_verde.png"]
 ROUTINE_ASSETS = {"Jardinagem": ASSETS_JARDINAGEM, "Pesca": ASSETS_PESCA}
+# assets que melhoram o desempenho mas não bloqueiam o início do bot
+OPTIONAL_ASSETS = {"Jardinagem": ["keyboard_virtual.png"], "Pesca": []}
 
 SCAN_INTERVAL = 0.05
 PESCA_INTERVAL = 0.001  # disponível se quiser aplicar no PescaBot
+# de onde vêm os frames: None = tela; pasta de imagens ou vídeo (ex.: "debug@10") = replay
+FRAME_SOURCE = None
+
+# OCR num processo separado (ocr_worker.py), compartilhável entre várias instâncias do bot
+OCR_OUT_OF_PROCESS = True
+OCR_ADDRESS = ("127.0.0.1", 6010)
+OCR_WORKERS = 1      # motores PaddleOCR no servidor
+OCR_TIMEOUT = 10.0   # s por leitura
+
+# latências por etapa (captura, matching, OCR, clique...): arquivo no formato do Prometheus + resumo na janela
+TELEMETRY_FILE = "telemetry.prom"
+TELEMETRY_INTERVAL = 15.0  # s entre gravações do arquivo
+TELEMETRY_REFRESH_MS = 1000  # atualização do resumo na janela
+
+# log: os bots só enfileiram; a UI escreve no terminal em lotes
+LOG_LEVEL = INFO
+LOG_DRAIN_MS = 100
+LOG_FILE = None  # ex.: "roxbot.log" (rotativo, 1 MB x 3)
 
 # ---------------------- UI / Logger ----------------------
 root = tk.Tk()
 root.title("Auto Solver")
 root.attributes("-topmost", True)
-root.geometry("250x220")  # janela pequena
+root.geometry("300x420")  # janela pequena
 root.resizable(False, False)
 
 status_label = tk.Label(root, text="🔴 Parado", fg="red", font=("Arial", 13))
 status_label.pack(pady=4)
 
-# Logger apenas no terminal
-def log(msg: str):
-    print(msg)
+# Logger apenas no terminal: enfileira (qualquer thread) e a UI drena em lotes
+log_sink = LogSink(level=LOG_LEVEL, path=LOG_FILE)
+
+def log(msg: str, level: int | None = None):
+    log_sink(msg, level)
+
+def drenar_logs():
+    lote = log_sink.drain()
+    if lote:
+        sys.stdout.write("".join(LogSink.format(rec) + "\n" for rec in lote))
+        sys.stdout.flush()
+    root.after(LOG_DRAIN_MS, drenar_logs)
 
 # ---------------------- Assets helpers ----------------------
-def gerar_assets_escalados():
+template_store = TemplateStore(ASSETS_DIR, SCALES, log=log)
+
+def carregar_templates():
+    """Decodifica os assets uma vez e monta as escalas em memória (sem gravar _scaleNN)."""
+    template_store.reload()
     for rotina, pasta in ROUTINES.items():
-        log(f"🔄 Gerando assets para {rotina}...")
-        required_assets = ROUTINE_ASSETS[rotina]
-        routine_dir = os.path.join(ASSETS_DIR, pasta)
-        for asset in required_assets:
-            asset_path = os.path.join(routine_dir, asset)
-            if not os.path.isfile(asset_path):
-                log(f"[!] Asset '{asset}' não encontrado em {pasta}.")
-                continue
-            img = cv2.imread(asset_path, cv2.IMREAD_UNCHANGED)
-            if img is None:
-                log(f"[!] Falha ao ler: {asset_path}")
-                continue
-            h, w = img.shape[:2]
-            for scale in SCALES:
-                if abs(scale - 1.0) < 1e-6:
-                    continue
-                resized = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
-                scale_suffix = f"_scale{int(scale*100)}"
-                filename, ext = os.path.splitext(asset)
-                new_name = f"{filename}{scale_suffix}{ext}"
-                new_path = os.path.join(routine_dir, new_name)
-                ok = cv2.imwrite(new_path, resized)
-                if ok:
-                    log(f"[+] Asset gerado: {pasta}/{new_name}")
-                else:
-                    log(f"[!] Falha ao salvar: {new_path}")
-    log("✅ Todos os assets escalados gerados.")
+        total = template_store.preload(pasta, ROUTINE_ASSETS[rotina])
+        template_store.preload(pasta, OPTIONAL_ASSETS[rotina])
+        log(f"[+] {rotina}: {total}/{len(ROUTINE_ASSETS[rotina])} templates em memória.")
+    log("✅ Templates (e escalas) carregados em memória.")
 
 def verificar_assets():
     all_ok = True
@@ -91,7 +104,13 @@ def verificar_assets():
     return all_ok
 
 # ---------------------- Instâncias dos bots ----------------------
-ocr_engine = PaddleOCR(use_angle_cls=False, lang='en')
+frame_source = open_source(FRAME_SOURCE)
+
+# o PaddleOCR só carrega (em segundo plano) quando a Jardinagem é escolhida no combobox ou iniciada
+if OCR_OUT_OF_PROCESS:
+    ocr_engine = OcrClient(OCR_ADDRESS, workers=OCR_WORKERS, timeout=OCR_TIMEOUT, log=log)
+else:
+    ocr_engine = LazyOcr(log=log, use_angle_cls=False, lang='en')
 
 jardinagem_bot = JardinagemBot(
     log=log,
@@ -100,6 +119,9 @@ jardinagem_bot = JardinagemBot(
     routine_folder=ROUTINES["Jardinagem"],
     scan_interval=SCAN_INTERVAL,
     scales=SCALES,
+    capture=frame_source,
+    templates=template_store,
+    ocr_cache=OcrCache(path=os.path.join(ASSETS_DIR, ROUTINES["Jardinagem"], "ocr_cache.json"), log=log),
 )
 
 pesca_bot = PescaBot(
@@ -107,6 +129,8 @@ pesca_bot = PescaBot(
     assets_dir=ASSETS_DIR,
     routine_folder=ROUTINES["Pesca"],
     scan_interval=SCAN_INTERVAL,  # ou PESCA_INTERVAL se preferir
+    capture=frame_source,
+    templates=template_store,
 )
 
 # ---------------------- Controle de execução ----------------------
@@ -119,6 +143,14 @@ routine_menu = ttk.Combobox(
 )
 routine_menu.pack(pady=3)
 
+def on_routine_selected(_event=None):
+    # nada de aquecer o OCR ao abrir: quem só roda a Pesca nunca paga o carregamento;
+    # com a Jardinagem já escolhida, o motor sobe ao apertar Iniciar (JardinagemBot.run)
+    if selected_routine.get() == "Jardinagem":
+        ocr_engine.start()
+
+routine_menu.bind("<<ComboboxSelected>>", on_routine_selected)
+
 def is_running():
     return bot_running
 
@@ -145,13 +177,25 @@ def toggle_bot():
 
 # Botões
 tk.Button(root, text="Iniciar / Parar", command=toggle_bot, bg="lightgray", font=("Arial", 10)).pack(pady=3)
-tk.Button(root, text="Gerar Assets Escalados", command=gerar_assets_escalados, bg="lightblue", font=("Arial", 10)).pack(pady=3)
+tk.Button(root, text="Recarregar Assets", command=carregar_templates, bg="lightblue", font=("Arial", 10)).pack(pady=3)
 tk.Button(root, text="Assistente de Assets (Jardinagem)", command=lambda: open_asset_wizard_jardinagem(root), bg="#e6ffd6", font=("Arial", 9)).pack(pady=2)
 tk.Button(root, text="Assistente de Assets (Pesca)", command=lambda: open_asset_wizard(root), bg="#ffe9b3", font=("Arial", 9)).pack(pady=2)
 
+# Resumo da telemetria da rotina selecionada (p50/p95/p99 por etapa)
+telemetry_label = tk.Label(root, text="", justify="left", anchor="w", font=("Consolas", 8), fg="#333")
+telemetry_label.pack(fill="x", padx=6, pady=4)
+
+def atualizar_telemetria():
+    telemetry_label.config(text=get_telemetry(ROUTINES[selected_routine.get()]).summary())
+    root.after(TELEMETRY_REFRESH_MS, atualizar_telemetria)
+
 if not verificar_assets():
     status_label.config(text="⚠️ Assets Incompletos", fg="orange")
 else:
     status_label.config(text="🟢 Pronto", fg="green")
+carregar_templates()
+start_exporter(TELEMETRY_FILE, TELEMETRY_INTERVAL, log=log)
+atualizar_telemetria()
+drenar_logs()
 
 root.mainloop()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+def _to_gray(img: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+
+class PyramidMatcher:
+    """
+    Template matching coarse-to-fine (TM_CCOEFF_NORMED).
+    1) casa a imagem e o template reduzidos em cinza e pega os `candidates` melhores picos;
+    2) refina cada pico em resolução cheia, só numa janela de `margin` px ao redor —
+       em cor se `color=True`, senão em cinza.
+    Buscas pequenas (ROI pouco maior que o template) vão direto para o match cheio,
+    pois ali a pirâmide não economiza nada.
+    Retorna (score, top_left) como o par max_val/max_loc do cv2.minMaxLoc.
+    """
+
+    def __init__(self, *, color: bool = False, candidates: int = 3, margin: int = 6,
+                 min_template_side: int = 12, max_levels: int = 3,
+                 direct_positions: int = 20000):
+        self.color = color
+        self.candidates = max(int(candidates), 1)
+        self.margin = max(int(margin), 1)
+        self.min_template_side = min_template_side
+        self.max_levels = max_levels
+        self.direct_positions = direct_positions
+        # templates em cinza/reduzidos por id() — mantém a referência p/ o id não ser reutilizado
+        self._tmpl_cache: dict[int, tuple[np.ndarray, np.ndarray, dict[float, np.ndarray]]] = {}
+
+    def _levels(self, template: np.ndarray) -> float:
+        """Fator de redução: metade por nível enquanto o template continuar legível."""
+        side = min(template.shape[:2])
+        factor = 1.0
+        for _ in range(self.max_levels):
+            if side * factor * 0.5 < self.min_template_side:
+                break
+            factor *= 0.5
+        return factor
+
+    def _template_gray(self, template: np.ndarray, factor: float) -> np.ndarray:
+        entry = self._tmpl_cache.get(id(template))
+        if entry is None or entry[0] is not template:
+            entry = (template, _to_gray(template), {})
+            self._tmpl_cache[id(template)] = entry
+        if factor >= 1.0:
+            return entry[1]
+        small = entry[2].get(factor)
+        if small is None:
+            gray = entry[1]
+            size = (max(int(gray.shape[1] * factor), 1), max(int(gray.shape[0] * factor), 1))
+            small = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+            entry[2][factor] = small
+        return small
+
+    @staticmethod
+    def _direct(image: np.ndarray, template: np.ndarray) -> tuple[float, tuple[int, int]]:
+        res = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        return float(max_val), max_loc
+
+    def match(self, image: np.ndarray, template: np.ndarray) -> tuple[float, Optional[tuple[int, int]]]:
+        t_h, t_w = template.shape[:2]
+        i_h, i_w = image.shape[:2]
+        if i_h < t_h or i_w < t_w:
+            return 0.0, None
+        source = template
+        if not self.color or image.ndim != template.ndim:
+            image = _to_gray(image)
+            template = self._template_gray(source, 1.0)
+
+        factor = self._levels(template)
+        if factor >= 1.0 or (i_w - t_w + 1) * (i_h - t_h + 1) <= self.direct_positions:
+            return self._direct(image, template)
+
+        # --- nível grosso (cinza reduzido) ---
+        small_t = self._template_gray(source, factor)
+        gray = _to_gray(image)
+        small_i = cv2.resize(gray, (max(int(i_w * factor), 1), max(int(i_h * factor), 1)),
+                             interpolation=cv2.INTER_AREA)
+        if small_i.shape[0] < small_t.shape[0] or small_i.shape[1] < small_t.shape[1]:
+            return self._direct(image, template)
+        coarse = cv2.matchTemplate(small_i, small_t, cv2.TM_CCOEFF_NORMED)
+
+        peaks = []
+        sup_w, sup_h = max(small_t.shape[1] // 2, 1), max(small_t.shape[0] // 2, 1)
+        for _ in range(self.candidates):
+            _, val, _, loc = cv2.minMaxLoc(coarse)
+            if val <= -1.0:
+                break
+            peaks.append(loc)
+            x, y = loc
+            coarse[max(y - sup_h, 0):y + sup_h + 1, max(x - sup_w, 0):x + sup_w + 1] = -1.0
+
+        # --- refino em resolução cheia numa janela ao redor de cada pico ---
+        best: tuple[float, Optional[tuple[int, int]]] = (-1.0, None)
+        pad = self.margin + int(round(1.0 / factor))
+        for cx, cy in peaks:
+            x0 = max(int(cx / factor) - pad, 0)
+            y0 = max(int(cy / factor) - pad, 0)
+            x1 = min(int(cx / factor) + t_w + pad, i_w)
+            y1 = min(int(cy / factor) + t_h + pad, i_h)
+            window = image[y0:y1, x0:x1]
+            if window.shape[0] < t_h or window.shape[1] < t_w:
+                continue
+            val, loc = self._direct(window, template)
+            if val > best[0]:
+                best = (val, (x0 + loc[0], y0 + loc[1]))
+        if best[1] is None:
+            return self._direct(image, template)
+        return best
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+
+
+class OcrCache:
+    """
+    Cache LRU dos textos do OCR, indexado por um hash perceptual da imagem.
+    O hash é um "average hash" em resolução média (64×16 bits por padrão): tolera ruído de
+    compressão/escala, mas ainda separa '7+9' de '7+8'. Com `path`, os textos confirmados
+    (`promote`, depois que o jogo aceitou a resposta) também vão para um JSON em disco e
+    sobrevivem entre sessões; `forget` tira uma leitura recusada dos dois níveis.
+    """
+
+    def __init__(self, capacity: int = 256, path: Optional[str] = None,
+                 hash_size: tuple[int, int] = (64, 16),
+                 log: Callable[[str], None] = print):
+        self.capacity = max(int(capacity), 1)
+        self.path = path
+        self.hash_size = hash_size
+        self.log = log
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._mem: OrderedDict[str, str] = OrderedDict()
+        self._disk: dict[str, str] = {}
+        self._lock = threading.Lock()
+        if path and os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._disk = dict(json.load(f))
+            except (OSError, ValueError) as e:
+                self.log(f"[!] Cache de OCR ignorado ({path}): {e}")
+
+    def key(self, img: np.ndarray, band: Optional[tuple[float, float, float, float]] = None) -> str:
+        """Hash perceptual da imagem (ou só da faixa `band` = x0, y0, x1, y1 em fração)."""
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        if band is not None:
+            h, w = gray.shape[:2]
+            x0, y0, x1, y1 = band
+            gray = gray[int(y0 * h):int(y1 * h), int(x0 * w):int(x1 * w)]
+        small = cv2.resize(gray, self.hash_size, interpolation=cv2.INTER_AREA)
+        bits = small > small.mean()
+        return np.packbits(bits).tobytes().hex()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._mem.get(key)
+            if text is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return text
+            text = self._disk.get(key)
+            if text is not None:
+                self.disk_hits += 1
+                self._remember(key, text)
+                return text
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: str, persist: bool = False) -> None:
+        """Guarda o texto; `persist=True` grava também no disco (use só p/ leituras validadas)."""
+        with self._lock:
+            self._remember(key, text)
+            if persist and self.path and self._disk.get(key) != text:
+                self._disk[key] = text
+                self._save()
+
+    def promote(self, key: str) -> bool:
+        """Grava no disco o texto em memória de `key` (leitura confirmada); False se não há."""
+        with self._lock:
+            text = self._mem.get(key)
+            if text is None or not self.path or self._disk.get(key) == text:
+                return False
+            self._disk[key] = text
+            self._save()
+            return True
+
+    def forget(self, key: str) -> None:
+        """Descarta `key` da memória e do disco (ex.: resposta recusada pelo jogo)."""
+        with self._lock:
+            self._mem.pop(key, None)
+            if self._disk.pop(key, None) is not None and self.path:
+                self._save()
+
+    def _remember(self, key: str, text: str) -> None:
+        self._mem[key] = text
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.capacity:
+            self._mem.popitem(last=False)
+
+    def _save(self) -> None:
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._disk, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            self.log(f"[!] Falha ao salvar cache de OCR: {e}")
+
+    def stats(self) -> str:
+        return f"hits {self.hits} | disco {self.disk_hits} | misses {self.misses} | {len(self._mem)} em memória"
@@ -0,0 +1,70 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import cv2
+import numpy as np
+
+
+def warm_up(engine) -> None:
+    """Inferência de aquecimento: a primeira chamada aloca buffers e compila kernels."""
+    amostra = np.full((48, 160, 3), 255, np.uint8)
+    cv2.putText(amostra, "7+9", (12, 36), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+    engine.ocr(amostra, cls=False)
+
+
+class LazyOcr:
+    """
+    PaddleOCR carregado sob demanda numa thread de fundo.
+    Importar o paddleocr e carregar o modelo leva vários segundos; por isso nada acontece
+    até `start()` (chamado quando a Jardinagem é escolhida). Depois de carregar, roda uma
+    inferência de aquecimento para a primeira leitura real não pagar a inicialização.
+    `ready` sinaliza quando o motor pode ser usado; `ocr()` espera por ele.
+    """
+
+    def __init__(self, log: Callable[[str], None] = print, **paddle_kwargs: Any):
+        self.log = log
+        self.paddle_kwargs = paddle_kwargs or {"use_angle_cls": False, "lang": "en"}
+        self.ready = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._engine = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        """Começa a carregar o modelo em segundo plano (chamadas repetidas são ignoradas)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._load, name="ocr-loader", daemon=True)
+            self._thread.start()
+
+    def _load(self) -> None:
+        inicio = time.perf_counter()
+        self.log("[⏳] Carregando PaddleOCR em segundo plano...")
+        try:
+            from paddleocr import PaddleOCR
+            engine = PaddleOCR(**self.paddle_kwargs)
+            warm_up(engine)
+            self._engine = engine
+            self.log(f"[✓] PaddleOCR pronto em {time.perf_counter() - inicio:.1f} s.")
+        except Exception as e:
+            self.error = e
+            self.log(f"[⚠️] Falha ao carregar o PaddleOCR: {e}")
+        finally:
+            self.ready.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Inicia o carregamento se preciso e espera; True se o motor está utilizável."""
+        self.start()
+        return self.ready.wait(timeout) and self._engine is not None
+
+    def ocr(self, img: np.ndarray, cls: bool = False):
+        if not self.wait():
+            raise RuntimeError(f"PaddleOCR indisponível: {self.error}")
+        return self._engine.ocr(img, cls=cls)
@@ -0,0 +1,351 @@
+"""
+Servidor de OCR fora do processo do bot.
+
+O PaddleOCR roda num processo próprio (`python ocr_worker.py`), com um pool de `--workers`
+motores já aquecidos. Os bots conversam com ele por um socket local
+(multiprocessing.connection): cada pedido leva só o nome de um bloco de memória
+compartilhada com a imagem, e a resposta volta de forma assíncrona (Future).
+Assim a inferência não segura o GIL do processo da UI/captura, e várias instâncias do bot
+(inclusive em processos diferentes) podem usar o mesmo servidor quente.
+
+O multiprocessing.connection desserializa (pickle) toda mensagem, então os dois lados se
+autenticam com uma chave aleatória por usuário, gerada no primeiro uso em KEY_FILE (legível
+só pelo dono). Outro processo sem a chave não consegue mandar pedidos ao servidor, nem se
+passar por ele para o bot.
+"""
+from __future__ import annotations
+import argparse
+import itertools
+import os
+import queue
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import AuthenticationError, shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+DEFAULT_ADDRESS = ("127.0.0.1", 6010)
+KEY_FILE = os.path.join(os.path.expanduser("~"), ".roxbot", "ocr.key")
+
+
+def load_authkey(path: str = KEY_FILE) -> bytes:
+    """Chave do servidor de OCR deste usuário; cria uma aleatória (modo 0600) se não existir."""
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, "w", encoding="ascii") as f:
+            f.write(secrets.token_hex(32))
+    if os.name == "posix" and os.stat(path).st_mode & 0o077:
+        os.chmod(path, 0o600)  # arquivo antigo/copiado com permissão aberta demais
+    with open(path, "r", encoding="ascii") as f:
+        key = f.read().strip()
+    if not key:
+        raise RuntimeError(f"chave do OCR vazia em {path}; apague o arquivo para gerar outra")
+    return key.encode()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Abre um bloco criado por outro processo sem registrá-lo no resource_tracker deste."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+# ---------------------- cliente (processo do bot) ----------------------
+class OcrClient:
+    """
+    Cliente do servidor de OCR, com a mesma interface do LazyOcr (`start`, `ready`, `wait`,
+    `ocr`). `start()` conecta em segundo plano e, se ninguém estiver ouvindo e `spawn=True`,
+    sobe o servidor. `ocr()` espera no máximo `timeout` segundos e devolve None se expirar,
+    se o servidor falhar na leitura ou se a conexão cair — nesse caso o cliente se marca
+    desconectado e o próximo `ocr()`/`wait()` reconecta (subindo o servidor de novo, se preciso).
+    """
+
+    def __init__(self, address: tuple[str, int] = DEFAULT_ADDRESS, *,
+                 key_file: str = KEY_FILE,
+                 workers: int = 1,
+                 timeout: float = 10.0,
+                 start_timeout: float = 120.0,
+                 spawn: bool = True,
+                 lang: str = "en",
+                 log: Callable[[str], None] = print):
+        self.address = address
+        self.key_file = key_file
+        self.authkey: Optional[bytes] = None  # lida em _connect (fora da thread da UI)
+        self.workers = max(int(workers), 1)
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self.spawn = spawn
+        self.lang = lang
+        self.log = log
+        self.ready = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._conn = None
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[subprocess.Popen] = None
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pending: dict[int, tuple[Future, shared_memory.SharedMemory, Any]] = {}
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.ready.clear()
+            self.error = None
+            self._thread = threading.Thread(target=self._connect, name="ocr-client", daemon=True)
+            self._thread.start()
+
+    def _spawn_server(self) -> None:
+        if self._server is not None and self._server.poll() is None:
+            return
+        host, port = self.address
+        cmd = [sys.executable, os.path.abspath(__file__), "--host", host, "--port", str(port),
+               "--workers", str(self.workers), "--lang", self.lang, "--key-file", self.key_file]
+        self._server = subprocess.Popen(cmd, creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        self.log(f"[⏳] Servidor de OCR iniciado (pid {self._server.pid}, {self.workers} worker(s)); aquecendo...")
+
+    def _connect(self) -> None:
+        inicio = time.perf_counter()
+        try:
+            if self.authkey is None:
+                self.authkey = load_authkey(self.key_file)
+            while True:
+                try:
+                    conn = Client(self.address, authkey=self.authkey)
+                    break
+                except (ConnectionRefusedError, FileNotFoundError) as e:
+                    if not self.spawn:
+                        raise
+                    self._spawn_server()
+                    if self._server.poll() is not None:
+                        raise RuntimeError(f"servidor de OCR saiu com código {self._server.returncode}") from e
+                    if time.perf_counter() - inicio > self.start_timeout:
+                        raise TimeoutError("servidor de OCR não respondeu a tempo") from e
+                    time.sleep(0.5)
+            self._conn = conn
+            threading.Thread(target=self._reader, args=(conn,), name="ocr-client-reader", daemon=True).start()
+            self.log(f"[✓] OCR conectado em {self.address[0]}:{self.address[1]} "
+                     f"({time.perf_counter() - inicio:.1f} s).")
+        except Exception as e:
+            self.error = e
+            with self._lock:
+                self._thread = None  # permite tentar de novo no próximo start()
+            self.log(f"[⚠️] OCR indisponível: {e}")
+        finally:
+            self.ready.set()
+
+    def _reader(self, conn) -> None:
+        try:
+            while True:
+                req_id, result, error = conn.recv()
+                entry = self._release(req_id)
+                if entry is None or entry.done():
+                    continue  # pedido já expirou
+                if error:
+                    entry.set_exception(RuntimeError(error))
+                else:
+                    entry.set_result(result)
+        except (EOFError, OSError) as e:
+            if self._conn is conn:  # fechada por _disconnect: já foi logado
+                self.log(f"[⚠️] Conexão com o servidor de OCR perdida: {e}")
+        finally:
+            self._disconnect(conn)
+            for req_id, (_, _, dono) in list(self._pending.items()):
+                if dono is not conn:
+                    continue  # pedido de uma conexão mais nova
+                fut = self._release(req_id)
+                if fut is not None and not fut.done():
+                    fut.set_exception(ConnectionError("servidor de OCR desconectado"))
+
+    def _disconnect(self, conn) -> None:
+        """Marca o cliente desconectado (se `conn` ainda é a conexão atual) e a fecha;
+        o próximo `wait()` conecta de novo."""
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+                self._thread = None
+                self.ready.clear()
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+    def _release(self, req_id: int) -> Optional[Future]:
+        """Tira o pedido da lista e libera a memória compartilhada da imagem."""
+        entry = self._pending.pop(req_id, None)
+        if entry is None:
+            return None
+        fut, shm, _ = entry
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        return fut
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        self.start()
+        return self.ready.wait(timeout) and self._conn is not None
+
+    def submit(self, img: np.ndarray, cls: bool = False) -> Future:
+        """Envia a imagem ao servidor; o Future recebe o mesmo retorno do PaddleOCR.ocr."""
+        conn = self._conn
+        if conn is None:
+            raise ConnectionError("servidor de OCR não conectado")
+        img = np.ascontiguousarray(img)
+        shm = shared_memory.SharedMemory(create=True, size=max(img.nbytes, 1))
+        np.ndarray(img.shape, img.dtype, buffer=shm.buf)[...] = img
+        req_id = next(self._ids)
+        fut: Future = Future()
+        self._pending[req_id] = (fut, shm, conn)
+        try:
+            with self._send_lock:
+                conn.send(("ocr", req_id, shm.name, img.shape, img.dtype.str, cls))
+        except OSError as e:
+            self._release(req_id)
+            self._disconnect(conn)
+            fut.set_exception(ConnectionError(f"falha ao enviar ao servidor de OCR: {e}"))
+        return fut
+
+    def ocr(self, img: np.ndarray, cls: bool = False):
+        """Mesmo retorno do PaddleOCR.ocr, ou None se a leitura falhou (o bot segue o loop)."""
+        if not self.wait(self.start_timeout):
+            self.log(f"[⚠️] OCR indisponível: {self.error}")
+            return None
+        inicio = time.perf_counter()
+        conn = self._conn
+        try:
+            fut = self.submit(img, cls)
+            return fut.result(self.timeout)
+        except FutureTimeout:
+            fut.cancel()
+            for req_id, (pendente, _, _) in list(self._pending.items()):
+                if pendente is fut:
+                    self._release(req_id)  # a resposta, se vier, é ignorada
+            self.log(f"[⚠️] OCR expirou após {time.perf_counter() - inicio:.1f} s.")
+        except RuntimeError as e:  # exceção do PaddleOCR no servidor; a conexão segue boa
+            self.log(f"[⚠️] Servidor de OCR falhou na leitura: {e}")
+        except (ConnectionError, OSError, EOFError) as e:
+            if conn is not None:
+                self._disconnect(conn)
+            self.log(f"[⚠️] OCR desconectado ({e}); reconectando na próxima leitura.")
+        return None
+
+
+# ---------------------- servidor (processo do OCR) ----------------------
+def _engine_loop(jobs: queue.Queue, status: dict, paddle_kwargs: dict[str, Any], idx: int) -> None:
+    try:
+        from paddleocr import PaddleOCR
+        from ocr_engine import warm_up
+        engine = PaddleOCR(**paddle_kwargs)
+        warm_up(engine)
+    except Exception as e:
+        print(f"[⚠️] [OCR worker {idx}] Falha ao carregar o PaddleOCR: {e}")
+        status["failed"] += 1
+        return
+    print(f"[✓] [OCR worker {idx}] pronto.")
+    status["ready"].set()
+    while True:
+        conn, send_lock, req_id, shm_name, shape, dtype, cls = jobs.get()
+        result, error = None, None
+        try:
+            shm = _attach(shm_name)
+            try:
+                img = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf).copy()
+            finally:
+                shm.close()
+            result = engine.ocr(img, cls=cls)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        try:
+            with send_lock:
+                conn.send((req_id, result, error))
+        except OSError:
+            pass  # cliente foi embora
+
+
+def _handle_client(conn, jobs: queue.Queue, status: dict) -> None:
+    send_lock = threading.Lock()
+    status["clients"] += 1
+    try:
+        while True:
+            msg = conn.recv()
+            if msg[0] == "ocr":
+                jobs.put((conn, send_lock, *msg[1:]))
+    except (EOFError, OSError):
+        pass
+    finally:
+        status["clients"] -= 1
+        status["last_seen"] = time.monotonic()
+        conn.close()
+
+
+def serve(address: tuple[str, int], authkey: bytes, workers: int = 1,
+          idle_exit: float = 300.0, **paddle_kwargs: Any) -> None:
+    """Sobe `workers` motores e atende pedidos até ficar `idle_exit` s sem nenhum cliente."""
+    paddle_kwargs = paddle_kwargs or {"use_angle_cls": False, "lang": "en"}
+    jobs: queue.Queue = queue.Queue()
+    status = {"ready": threading.Event(), "failed": 0, "clients": 0, "last_seen": time.monotonic()}
+    for i in range(max(workers, 1)):
+        threading.Thread(target=_engine_loop, args=(jobs, status, paddle_kwargs, i),
+                         name=f"ocr-engine-{i}", daemon=True).start()
+    # só aceita conexões depois que o primeiro motor aqueceu (o cliente fica tentando)
+    while not status["ready"].wait(0.5):
+        if status["failed"] >= max(workers, 1):
+            sys.exit(1)
+
+    listener = Listener(address, authkey=authkey)
+    print(f"[✓] Servidor de OCR ouvindo em {address[0]}:{address[1]}.")
+
+    def _watchdog():
+        while True:
+            time.sleep(5)
+            if idle_exit > 0 and status["clients"] == 0 and time.monotonic() - status["last_seen"] > idle_exit:
+                print("[⏹] Servidor de OCR ocioso; encerrando.")
+                os._exit(0)
+
+    threading.Thread(target=_watchdog, daemon=True).start()
+    while True:
+        try:
+            conn = listener.accept()
+        except (AuthenticationError, OSError) as e:  # processo sem a chave: recusa e segue
+            print(f"[⚠️] Conexão recusada no servidor de OCR: {type(e).__name__}: {e}")
+            continue
+        threading.Thread(target=_handle_client, args=(conn, jobs, status), daemon=True).start()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor de OCR (PaddleOCR) compartilhado entre bots.")
+    parser.add_argument("--host", default=DEFAULT_ADDRESS[0])
+    parser.add_argument("--port", type=int, default=DEFAULT_ADDRESS[1])
+    parser.add_argument("--workers", type=int, default=1, help="motores PaddleOCR em paralelo")
+    parser.add_argument("--idle-exit", type=float, default=300.0, help="encerra após N s sem clientes (0 = nunca)")
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--key-file", default=KEY_FILE, help="chave compartilhada com os bots")
+    args = parser.parse_args()
+    serve((args.host, args.port), load_authkey(args.key_file), args.workers, args.idle_exit,
+          use_angle_cls=False, lang=args.lang)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,22 @@
 from __future__ import annotations
+import copy
+import json
 import os
 import time
+from collections import deque
 import cv2
 import mss
 import numpy as np
-import pyautogui
 from typing import Optional
 
+from frame_change import ChangeDetector
+from frame_source import FrameSource
+from input_driver import InputDriver, get_driver
+from matcher import PyramidMatcher
+from screen_capture import get_capture
+from telemetry import Telemetry, get_telemetry
+from template_store import TemplateStore
+
 # ==== Assistente de captura de assets (opcional) ====
 try:
     import tkinter as tk
@@ -113,44 +123,198 @@ def open_asset_wizard(master: Optional[tk.Misc] = None) -> None:
     AssetWizard(master or tk._default_root)
 
 
+# ==== Configuração (assets/pesca/assets_config.json) ====
+CONFIG_FILE = "assets_config.json"
+DEFAULT_CONFIG = {
+    "monitor_index": 1,
+    "pad_frac": 0.1,
+    "thresholds": {"lancar": 0.88, "carretel_ok": 0.90, "carretel_neg": 0.86},
+    "rois": {},
+    "decision": {"ok_neg_margin": 0.02, "green_ratio_min": 0.14, "neg_max_for_click": 0.9,
+                 "green_hsv_min": [30, 90, 150], "green_hsv_max": [90, 255, 255]},
+    "timing": {"click_cooldown_ms": 180, "post_launch_delay": 0.0, "ok_frames_required": 1,
+               "green_timeout": 8.0},
+    "loop": {"enabled": True, "delay_after_click": 0.0},
+}
+
+
+def carregar_config(path: str, log=print) -> dict:
+    """Lê o JSON da pesca por cima dos valores padrão (seções são mescladas, não substituídas)."""
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if not os.path.isfile(path):
+        log(f"[ℹ️] {path} não encontrado; usando configuração padrão da pesca.")
+        return config
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        log(f"[!] Falha ao ler {path}: {e}; usando configuração padrão.")
+        return config
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            config[key].update(value)
+        else:
+            config[key] = value
+    return config
+
+
+def razao_verde(img_bgr: np.ndarray, hsv_min, hsv_max, area_ref: Optional[int] = None) -> float:
+    """
+    Fração de pixels "verde carretel" (faixa HSV) na imagem. Com `area_ref`, a contagem é
+    dividida pela área de referência (ex.: do template) em vez da área da ROI, para que o
+    limiar não dependa do tamanho da ROI.
+    """
+    hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
+    verdes = cv2.countNonZero(cv2.inRange(hsv, np.array(hsv_min, np.uint8), np.array(hsv_max, np.uint8)))
+    area = area_ref or (img_bgr.shape[0] * img_bgr.shape[1])
+    return min(verdes / max(area, 1), 1.0)
+
+
+class DecisorCarretel:
+    """
+    Decide quando clicar no carretel (seções `decision`/`timing` do config):
+    o verde precisa vencer o carretel normal por `ok_neg_margin` no MESMO frame,
+    repetir-se por `ok_frames_required` frames seguidos e respeitar `click_cooldown_ms`.
+    Os últimos scores ficam num buffer circular para diagnóstico.
+    """
+
+    def __init__(self, config: dict, historico: int = 32):
+        self.thr_ok = config["thresholds"]["carretel_ok"]
+        self.margin = config["decision"]["ok_neg_margin"]
+        self.neg_max = config["decision"]["neg_max_for_click"]
+        self.frames_required = max(int(config["timing"]["ok_frames_required"]), 1)
+        self.cooldown = config["timing"]["click_cooldown_ms"] / 1000.0
+        self.scores: deque[tuple[float, float, float, float]] = deque(maxlen=historico)
+        self._seguidos = 0
+        self._ultimo_clique = 0.0
+
+    def avaliar(self, ok: float, neg: float, ratio: float) -> bool:
+        """Registra o frame e diz se o clique está liberado."""
+        agora = time.perf_counter()
+        self.scores.append((agora, ok, neg, ratio))
+        positivo = ok >= self.thr_ok and (ok - neg) >= self.margin and neg < self.neg_max
+        self._seguidos = self._seguidos + 1 if positivo else 0
+        if self._seguidos < self.frames_required:
+            return False
+        return agora - self._ultimo_clique >= self.cooldown
+
+    def clicou(self) -> None:
+        self._ultimo_clique = time.perf_counter()
+        self._seguidos = 0
+
+    def reset(self) -> None:
+        self._seguidos = 0
+
+    def resumo(self, n: int = 5) -> str:
+        ultimos = list(self.scores)[-n:]
+        return " | ".join(f"ok {ok:.2f} neg {neg:.2f} verde {ratio:.2f}" for _, ok, neg, ratio in ultimos)
+
+
 class PescaBot:
     def __init__(self, *,
                  log,
                  assets_dir: str,
                  routine_folder: str = "pesca",
-                 scan_interval: float = 0.05):
+                 scan_interval: float = 0.05,
+                 capture: Optional[FrameSource] = None,
+                 templates: Optional[TemplateStore] = None,
+                 config_path: Optional[str] = None,
+                 input_driver: Optional[InputDriver] = None,
+                 telemetry: Optional[Telemetry] = None):
         self.log = log
         self.assets_dir = assets_dir
         self.routine_folder = routine_folder
         self.scan_interval = scan_interval
+        self.capture = capture or get_capture()
+        self.templates = templates or TemplateStore(assets_dir, log=log)
+        self.input = input_driver or get_driver()
+        self.telemetry = telemetry or get_telemetry(routine_folder)
+        self.config_path = config_path or os.path.join(assets_dir, routine_folder, CONFIG_FILE)
+        self.config = carregar_config(self.config_path, log)
+        self.rois: dict[str, tuple[int, int, int, int]] = {}
+        self.monitor_rect: Optional[tuple[int, int, int, int]] = None
+        self.detector = ChangeDetector()
+        # verde × normal se distinguem pela cor: o refino final é feito em BGR
+        self.matcher = PyramidMatcher(color=True)
+
+    def _resolver_rois(self) -> None:
+        """Converte as ROIs fracionárias do config em (left, top, width, height) do monitor real."""
+        mon = self.capture.monitor(self.config["monitor_index"])
+        left, top, width, height = mon["left"], mon["top"], mon["width"], mon["height"]
+        self.monitor_rect = (left, top, width, height)
+        pad = float(self.config.get("pad_frac", 0.0))
+        self.rois = {}
+        for name, (fx, fy, fw, fh) in self.config["rois"].items():
+            x0 = max(fx - fw * pad, 0.0)
+            y0 = max(fy - fh * pad, 0.0)
+            x1 = min(fx + fw * (1 + pad), 1.0)
+            y1 = min(fy + fh * (1 + pad), 1.0)
+            self.rois[name] = (left + int(x0 * width), top + int(y0 * height),
+                               max(int((x1 - x0) * width), 1), max(int((y1 - y0) * height), 1))
+            self.log(f"[📐] ROI {name}: {self.rois[name]}")
+
+    def _regiao(self, imagem_base: str):
+        """ROI configurada do asset; sem ROI, o monitor inteiro do config."""
+        return self.rois.get(imagem_base, self.monitor_rect)
+
+    def _capturar(self, region):
+        with self.telemetry.stage("capture"):
+            return self.capture.grab(region)
+
+    def _esperar(self, segundos: float) -> None:
+        with self.telemetry.stage("sleep"):
+            time.sleep(segundos)
 
     def _clicar(self, posicao: tuple[int, int]):
-        self.log(f"[→] Clicando em {posicao}")
-        pyautogui.moveTo(posicao[0], posicao[1], duration=0)
-        pyautogui.click()
+        ms = self.input.click(*posicao)
+        self.telemetry.observe("click", ms)
+        self.log(f"[→] Clicado em {posicao} ({ms:.1f} ms)")
+
+    def _razao_verde(self, frame: np.ndarray) -> float:
+        """Pré-filtro barato: só vale rodar o matchTemplate se a ROI tiver verde suficiente."""
+        decision = self.config["decision"]
+        template = self.templates.get(self.routine_folder, "carretel_verde.png")
+        area_ref = template.shape[0] * template.shape[1] if template is not None else None
+        with self.telemetry.stage("cvt"):
+            return razao_verde(frame, decision["green_hsv_min"], decision["green_hsv_max"], area_ref)
 
-    def _encontrar(self, imagem_base: str, region=None, threshold=0.90):
-        template_path = os.path.join(self.assets_dir, self.routine_folder, imagem_base)
-        template = cv2.imread(template_path, cv2.IMREAD_COLOR)
+    def _pontuar(self, screenshot: np.ndarray, template: Optional[np.ndarray]):
+        """Melhor score do template no frame e o centro (coords do frame); (0, None) se não couber."""
         if template is None:
+            return 0.0, None
+        with self.telemetry.stage("match"):
+            max_val, max_loc = self.matcher.match(screenshot, template)
+        if max_loc is None:
+            return 0.0, None
+        t_h, t_w = template.shape[:2]
+        return max_val, (max_loc[0] + t_w // 2, max_loc[1] + t_h // 2)
+
+    def _avaliar_carretel(self, frame: np.ndarray, tmpl_ok, tmpl_neg):
+        """(razão verde, score ok, score neg, centro) do frame; só faz matching se passar no gate."""
+        ratio = self._razao_verde(frame)
+        if ratio < self.config["decision"]["green_ratio_min"]:
+            return ratio, 0.0, 0.0, None
+        ok, centro = self._pontuar(frame, tmpl_ok)
+        neg, _ = self._pontuar(frame, tmpl_neg)
+        return ratio, ok, neg, centro
+
+    def _encontrar(self, imagem_base: str, region=None, threshold=0.90, screenshot=None):
+        template = self.templates.get(self.routine_folder, imagem_base)
+        if template is None:
+            template_path = os.path.join(self.assets_dir, self.routine_folder, imagem_base)
             self.log(f"[!] Template não encontrado: {template_path}")
             return None
         t_h, t_w = template.shape[:2]
-        with mss.mss() as sct:
-            monitor = {"top": region[1], "left": region[0], "width": region[2], "height": region[3]} if region else sct.monitors[1]
-            screenshot = np.array(sct.grab(monitor))
-            screenshot = cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR)
+        if screenshot is None:
+            screenshot = self._capturar(region)
         s_h, s_w = screenshot.shape[:2]
         if s_h < t_h or s_w < t_w:
             self.log(f"[⚠️] ROI muito pequena para '{imagem_base}', usando tela cheia.")
-            with mss.mss() as sct:
-                monitor = sct.monitors[1]
-                screenshot = np.array(sct.grab(monitor))
-                screenshot = cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR)
-        result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            region = self.monitor_rect
+            screenshot = self._capturar(region)
+        max_val, centro = self._pontuar(screenshot, template)
         if max_val >= threshold:
-            pos_x, pos_y = max_loc[0] + t_w // 2, max_loc[1] + t_h // 2
+            pos_x, pos_y = centro
             if region:
                 pos_x += region[0]
                 pos_y += region[1]
@@ -158,28 +322,66 @@ class PescaBot:
             return (pos_x, pos_y)
         return None
 
+    def _roi_carretel(self, lancar_pos: tuple[int, int]):
+        roi = self.rois.get("carretel_verde.png")
+        if roi:
+            return roi
+        # sem ROI no config: caixa fixa ao redor do botão de lançar (comportamento antigo)
+        roi_size = 400
+        return (
+            max(lancar_pos[0] - roi_size // 2, 0),
+            max(lancar_pos[1] - roi_size // 2, 0),
+            roi_size, roi_size
+        )
+
     def run(self, is_running):
-        while is_running():
-            lancar_pos = self._encontrar("lancar.png", threshold=0.88)
-            if lancar_pos:
-                self._clicar(lancar_pos)
-                self.log("[🎣] Vara lançada. Aguardando carretel verde...")
-                start_time = time.time()
-                found_green = False
-                roi_size = 400
-                carretel_roi = (
-                    max(lancar_pos[0] - roi_size // 2, 0),
-                    max(lancar_pos[1] - roi_size // 2, 0),
-                    roi_size, roi_size
-                )
-                while is_running() and (time.time() - start_time < 8):
-                    verde_pos = self._encontrar("carretel_verde.png", region=carretel_roi, threshold=0.90)
-                    if verde_pos:
-                        self._clicar(verde_pos)
-                        self.log("[✅] Carretel VERDE detectado e clicado!")
-                        found_green = True
+        self._resolver_rois()
+        thresholds = self.config["thresholds"]
+        timing = self.config["timing"]
+        loop = self.config["loop"]
+        decisor = DecisorCarretel(self.config)
+        try:
+            while is_running():
+                inicio_tick = time.perf_counter()
+                regiao_lancar = self._regiao("lancar.png")
+                frame = self._capturar(regiao_lancar)
+                # tela parada desde a última busca? reaproveita o resultado
+                lancar_pos = self.detector.cached("lancar.png", frame, lambda: self._encontrar(
+                    "lancar.png", region=regiao_lancar, threshold=thresholds["lancar"], screenshot=frame))
+                if lancar_pos:
+                    self._clicar(lancar_pos)
+                    self.telemetry.incr("lancamentos")
+                    self.log("[🎣] Vara lançada. Aguardando carretel verde...")
+                    self._esperar(timing["post_launch_delay"])
+                    start_time = time.time()
+                    found_green = False
+                    carretel_roi = self._roi_carretel(lancar_pos)
+                    tmpl_ok = self.templates.get(self.routine_folder, "carretel_verde.png")
+                    tmpl_neg = self.templates.get(self.routine_folder, "carretel.png")
+                    decisor.reset()
+                    self.detector.reset("carretel")
+                    while is_running() and (time.time() - start_time < timing["green_timeout"]):
+                        frame = self._capturar(carretel_roi)
+                        ratio, ok, neg, centro = self.detector.cached(
+                            "carretel", frame, lambda: self._avaliar_carretel(frame, tmpl_ok, tmpl_neg))
+                        if decisor.avaliar(ok, neg, ratio) and centro:
+                            self._clicar((carretel_roi[0] + centro[0], carretel_roi[1] + centro[1]))
+                            decisor.clicou()
+                            self.telemetry.incr("verdes")
+                            self.telemetry.observe("fisgada", (time.time() - start_time) * 1000)
+                            self.log(f"[✅] Carretel VERDE detectado e clicado! (ok {ok:.2f} / neg {neg:.2f})")
+                            found_green = True
+                            break
+                    if not found_green:
+                        self.telemetry.incr("timeouts")
+                        self.log("[!] Timeout: Carretel verde não apareceu.")
+                        self.log(f"[📊] Últimos scores: {decisor.resumo()}")
+                    elif not loop["enabled"]:
                         break
-                if not found_green:
-                    self.log("[!] Timeout: Carretel verde não apareceu.")
-            time.sleep(self.scan_interval)
+                    else:
+                        self._esperar(loop["delay_after_click"])
+                self.telemetry.observe("tick", (time.perf_counter() - inicio_tick) * 1000)
+                self._esperar(self.scan_interval)
+        finally:
+            self.capture.release_thread()  # solta o handle de captura desta thread
         self.log("[⏹] Pesca parada.")
@@ -0,0 +1,150 @@
+from __future__ import annotations
+import os
+import threading
+from typing import Callable, Iterable
+
+import cv2
+import numpy as np
+
+
+class TemplateStore:
+    """
+    Cache em memória dos templates das rotinas.
+    Cada asset é decodificado UMA vez e as versões escaladas (pirâmide de escalas)
+    são geradas em memória — não há mais leitura/decodificação de PNG no loop.
+    """
+
+    def __init__(self, assets_dir: str,
+                 scales: Iterable[float] = (1.0,),
+                 log: Callable[[str], None] = print):
+        self.assets_dir = assets_dir
+        self.scales = [s for s in scales if s > 0] or [1.0]
+        self.log = log
+        self._cache: dict[tuple[str, str], list[tuple[float, np.ndarray]]] = {}
+        self._lock = threading.Lock()
+
+    def _build(self, folder: str, name: str) -> list[tuple[float, np.ndarray]]:
+        path = os.path.join(self.assets_dir, folder, name)
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is None:
+            return []
+        h, w = img.shape[:2]
+        # escala 1.0 primeiro, demais na ordem configurada
+        pyramid = [(1.0, img)]
+        for scale in self.scales:
+            if abs(scale - 1.0) < 1e-6:
+                continue
+            size = (max(int(w * scale), 1), max(int(h * scale), 1))
+            pyramid.append((scale, cv2.resize(img, size, interpolation=cv2.INTER_AREA)))
+        return pyramid
+
+    def pyramid(self, folder: str, name: str) -> list[tuple[float, np.ndarray]]:
+        """Lista [(escala, template BGR)] do asset; vazia se o arquivo não existe."""
+        key = (folder, name)
+        pyramid = self._cache.get(key)
+        if pyramid is None:
+            with self._lock:
+                pyramid = self._cache.get(key)
+                if pyramid is None:
+                    pyramid = self._build(folder, name)
+                    if pyramid:
+                        self._cache[key] = pyramid
+        return pyramid
+
+    def get(self, folder: str, name: str, scale: float = 1.0) -> np.ndarray | None:
+        """Template numa escala específica (None se não houver)."""
+        for s, img in self.pyramid(folder, name):
+            if abs(s - scale) < 1e-6:
+                return img
+        return None
+
+    def preload(self, folder: str, names: Iterable[str]) -> int:
+        """Decodifica antecipadamente os assets; retorna quantos foram carregados."""
+        loaded = 0
+        for name in names:
+            if self.pyramid(folder, name):
+                loaded += 1
+            else:
+                self.log(f"[!] Falha ao carregar template: {folder}/{name}")
+        return loaded
+
+    def reload(self) -> None:
+        """Descarta o cache (ex.: após salvar novos assets no assistente)."""
+        with self._lock:
+            self._cache.clear()
+
+
+class ScaleCalibrator:
+    """
+    Calibra a escala real da UI a partir de matches fortes e trava nela.
+    Destravado: a busca usa todas as escalas e registra votos dos matches fortes;
+    com `samples` votos majoritários numa escala, passa a buscar só nela.
+    Travado: matches fracos seguidos destravam (recalibração) e, a cada
+    `probe_every` buscas sem resultado, uma varredura completa confere se a UI
+    mudou de escala.
+    """
+
+    def __init__(self, strong: float = 0.85, samples: int = 3, probe_every: int = 40,
+                 log: Callable[[str], None] = print):
+        self.strong = strong
+        self.samples = max(int(samples), 1)
+        self.probe_every = max(int(probe_every), 1)
+        self.log = log
+        self.locked: float | None = None
+        self._votes: list[float] = []
+        self._weak = 0
+        self._misses = 0
+        self._probe = False
+
+    def filter(self, pyramid: list[tuple[float, np.ndarray]]) -> list[tuple[float, np.ndarray]]:
+        """Entradas da pirâmide que devem ser testadas nesta busca."""
+        if self.locked is None or self._probe:
+            return pyramid
+        return [p for p in pyramid if abs(p[0] - self.locked) < 1e-6] or pyramid
+
+    def hit(self, scale: float, score: float) -> None:
+        self._probe = False
+        self._misses = 0
+        if self.locked is None:
+            if score >= self.strong:
+                self._votes = (self._votes + [scale])[-self.samples:]
+                if len(self._votes) >= self.samples:
+                    best = max(set(self._votes), key=self._votes.count)
+                    if self._votes.count(best) > self.samples // 2:
+                        self._lock(best)
+            return
+        if abs(scale - self.locked) > 1e-6:
+            # varredura de conferência achou a UI em outra escala
+            if score >= self.strong:
+                self.log(f"[↻] Escala da UI mudou ({self.locked:.1f} → {scale:.1f}); recalibrando.")
+                self.reset()
+                self._votes = [scale]
+            return
+        if score < self.strong:
+            self._weak += 1
+            if self._weak >= self.samples:
+                self.log(f"[↻] Confiança caiu na escala {self.locked:.1f}; recalibrando.")
+                self.reset()
+        else:
+            self._weak = 0
+
+    def miss(self) -> None:
+        self._probe = False
+        if self.locked is not None:
+            self._misses += 1
+            if self._misses >= self.probe_every:
+                self._misses = 0
+                self._probe = True
+
+    def reset(self) -> None:
+        self.locked = None
+        self._votes = []
+        self._weak = 0
+        self._misses = 0
+        self._probe = False
+
+    def _lock(self, scale: float) -> None:
+        self.locked = scale
+        self._weak = 0
+        self._misses = 0
+        self.log(f"[🎯] Escala da UI calibrada em {scale:.1f}.")
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROXBOT_DIR = os.path.join(ROOT, "roxbot")
+SAM_DIR = os.path.join(ROOT, "roxbot-sam")
+
+# os dois apps importam os módulos pelo nome (screen_capture, input_driver, ...); os
+# compartilhados são cópias idênticas, então tanto faz de qual pasta vêm
+for _path in (SAM_DIR, ROXBOT_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+# o auto_bot abre a fonte de frames ao ser importado: replay dos frames gravados, sem monitor
+os.environ.setdefault("ROXBOT_FRAME_SOURCE", os.path.join(ROXBOT_DIR, "debug"))
+
+
+@pytest.fixture
+def sam_dir(monkeypatch):
+    """Roda o teste de dentro do roxbot-sam (assets e pastas de debug são relativos)."""
+    monkeypatch.chdir(SAM_DIR)
+    return SAM_DIR
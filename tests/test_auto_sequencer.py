@@ -0,0 +1,103 @@
+import threading
+import time
+
+import cv2
+import pytest
+
+from frame_source import SyntheticSource
+from input_driver import RecordingDriver
+
+SEM_SALTO = {"region": "a"}
+NAVEGA = {"region": "b", "skippable": True}
+
+
+def _passos(*regioes, **extra):
+    return [{"region": r, **extra} for r in regioes]
+
+
+@pytest.fixture
+def seq(sam_dir):
+    import auto_sequencer
+    return auto_sequencer
+
+
+def test_lookahead_desligado_por_padrao(seq):
+    steps = _passos("a", "b", "c", "d")
+    assert [seq._lookahead(steps, i) for i in range(4)] == [[0], [1], [2], [3]]
+
+
+def test_lookahead_para_antes_de_passo_nao_skippable(seq):
+    steps = [NAVEGA, SEM_SALTO, {"region": "c"}, {"region": "d"}]
+    assert seq._lookahead(steps, 0) == [0, 1]
+    assert seq._lookahead(steps, 1) == [1]
+    # o padrão da sequência vale para quem não define `skippable`
+    assert seq._lookahead(steps, 1, skippable=True) == [1, 2, 3]
+
+
+def test_lookahead_nao_salta_para_passo_repetido(seq):
+    steps = _passos("abrir", "enviar", "abrir", "fechar")
+    assert seq._repeats_earlier(steps, 2)
+    assert not seq._repeats_earlier(steps, 3)
+    assert seq._lookahead(steps, 0, skippable=True) == [0, 1]
+    assert seq._lookahead(steps, 1, skippable=True) == [1, 3]
+
+
+def test_template_compartilhado_conta_como_repeticao(seq):
+    steps = [{"region": "a", "templates": ["ok"]}, {"region": "b"}, {"region": "c", "templates": ["ok", "x"]}]
+    assert seq._repeats_earlier(steps, 2)
+    assert seq._lookahead(steps, 1, skippable=True) == [1]
+
+
+def test_lookahead_nunca_passa_do_ultimo(seq):
+    steps = _passos("a", "b", "c", skippable=True)
+    assert seq._lookahead(steps, 1) == [1, 2]
+    assert seq._lookahead(steps, 2) == [2]
+
+
+@pytest.mark.parametrize("usar_watcher", [True, False], ids=["watcher", "polling"])
+def test_sequencia_salta_passo_que_nao_apareceu(seq, monkeypatch, usar_watcher):
+    """O clique no passo 0 leva direto ao 2 (o 1 nunca aparece): a sequência tem de pular."""
+    import auto_bot
+
+    steps = seq.SEQUENCE_REGISTRY["missoes"]["steps"]
+    fonte_original = auto_bot.capture
+    src = SyntheticSource((2560, 1440))
+    auto_bot.set_frame_source(src)
+    regions = auto_bot.get_pixel_regions()
+
+    def mostrar(i):
+        nome = steps[i]["region"]
+        x1, y1, x2, y2 = regions[nome]
+        tmpl = cv2.imread(f"assets/missao/{nome}.png")
+        src.show(nome, tmpl, ((x1 + x2 - tmpl.shape[1]) // 2, (y1 + y2 - tmpl.shape[0]) // 2))
+
+    atual = {"i": 0}
+
+    def reagir(x, y):
+        i = atual["i"]
+        proximo = 2 if i == 0 else i + 1
+        atual["i"] = proximo
+
+        def depois():  # a tela reage um pouco depois do clique, como no jogo
+            time.sleep(0.05)
+            src.hide(steps[i]["region"])
+            if proximo < len(steps):
+                mostrar(proximo)
+
+        threading.Thread(target=depois, daemon=True).start()
+
+    driver = RecordingDriver(on_click=reagir)
+    monkeypatch.setattr(auto_bot, "input_driver", driver)
+    monkeypatch.setattr(auto_bot, "USE_WATCHER", usar_watcher)
+    monkeypatch.setattr(auto_bot, "set_running", lambda value: None)
+    monkeypatch.setattr(auto_bot, "start_loop", lambda: None)
+    try:
+        mostrar(0)
+        seq.run_sequence("missoes")
+    finally:
+        auto_bot.set_frame_source(fonte_original)
+
+    clicados = [next(r for r in (s["region"] for s in steps)
+                     if regions[r][0] <= x < regions[r][2] and regions[r][1] <= y < regions[r][3])
+                for _, x, y in driver.events]
+    assert clicados == ["init_mission", "mission_go", "mission_agree"]
@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+
+from ocr_cache import OcrCache
+
+
+def _img(seed):
+    return np.random.default_rng(seed).integers(0, 256, (40, 160), dtype=np.uint8)
+
+
+def test_chave_estavel_e_distinta():
+    cache = OcrCache()
+    assert cache.key(_img(1)) == cache.key(_img(1).copy())
+    assert cache.key(_img(1)) != cache.key(_img(2))
+
+
+def test_lru_descarta_o_menos_usado():
+    cache = OcrCache(capacity=2)
+    cache.put("a", "1+1")
+    cache.put("b", "2+2")
+    assert cache.get("a") == "1+1"  # "a" passa a ser o mais recente
+    cache.put("c", "3+3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1+1"
+    assert cache.get("c") == "3+3"
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_so_leitura_confirmada_vai_para_o_disco(tmp_path):
+    path = tmp_path / "ocr_cache.json"
+    cache = OcrCache(path=str(path))
+    cache.put("a", "7+9")
+    assert not path.exists()
+    assert cache.promote("a")
+    assert not cache.promote("a")  # já estava no disco
+    assert not cache.promote("nunca_lido")
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": "7+9"}
+
+    relido = OcrCache(path=str(path))
+    assert relido.get("a") == "7+9"
+    assert relido.disk_hits == 1
+
+
+def test_forget_tira_dos_dois_niveis(tmp_path):
+    path = tmp_path / "ocr_cache.json"
+    cache = OcrCache(path=str(path))
+    cache.put("a", "7+8")
+    cache.promote("a")
+    cache.forget("a")
+    assert cache.get("a") is None
+    assert json.loads(path.read_text(encoding="utf-8")) == {}
+    assert OcrCache(path=str(path)).get("a") is None
@@ -0,0 +1,50 @@
+from input_driver import RecordingDriver
+from pesca import DecisorCarretel
+
+CONFIG = {
+    "thresholds": {"carretel_ok": 0.8},
+    "decision": {"ok_neg_margin": 0.1, "neg_max_for_click": 0.7},
+    "timing": {"ok_frames_required": 3, "click_cooldown_ms": 0},
+}
+
+VERDE = (0.9, 0.5, 0.4)  # ok, neg, ratio de um frame com o carretel verde
+NORMAL = (0.5, 0.9, 0.0)
+
+
+def _rodar(decisor, frames):
+    """Simula o loop da pesca: clica (no RecordingDriver) quando o decisor libera."""
+    driver = RecordingDriver()
+    for i, scores in enumerate(frames):
+        if decisor.avaliar(*scores):
+            driver.click(i, 0)
+            decisor.clicou()
+    return [x for _, x, _ in driver.events]
+
+
+def test_clica_so_depois_de_frames_seguidos():
+    assert _rodar(DecisorCarretel(CONFIG), [VERDE] * 2) == []
+    assert _rodar(DecisorCarretel(CONFIG), [VERDE] * 3) == [2]
+
+
+def test_frame_negativo_zera_a_contagem():
+    frames = [VERDE, VERDE, NORMAL, VERDE, VERDE, VERDE]
+    assert _rodar(DecisorCarretel(CONFIG), frames) == [5]
+
+
+def test_margem_e_limite_do_negativo():
+    empatado = (0.9, 0.85, 0.4)  # verde alto, mas o normal também: ruído, não clique
+    assert _rodar(DecisorCarretel(CONFIG), [empatado] * 5) == []
+
+
+def test_cooldown_segura_o_segundo_clique():
+    config = {**CONFIG, "timing": {"ok_frames_required": 1, "click_cooldown_ms": 60_000}}
+    assert _rodar(DecisorCarretel(config), [VERDE] * 10) == [0]
+
+
+def test_reset_descarta_frames_acumulados():
+    decisor = DecisorCarretel(CONFIG)
+    decisor.avaliar(*VERDE)
+    decisor.avaliar(*VERDE)
+    decisor.reset()
+    assert not decisor.avaliar(*VERDE)
+    assert "ok 0.90 neg 0.50" in decisor.resumo(1)